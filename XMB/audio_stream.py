@@ -0,0 +1,242 @@
+# audio_stream.py
+# Decodificación por bloques de la pista que muestra MusicVisualizer. La
+# reproducción la hace pygame.mixer.music; aquí solo hace falta el PCM de la
+# ventana que se está visualizando, así que un hilo decodifica (ffmpeg por
+# tubería, o leyendo el PCM de los .wav si no hay ffmpeg) a mono float32 en
+# un búfer circular de RING_SECONDS y se detiene cuando lo ha llenado por
+# delante de la posición de reproducción. La memoria no depende de la duración
+# de la pista y la visualización empieza en cuanto llega el primer bloque.
+#
+# La normalización usa el pico visto hasta el momento (antes se usaba el pico
+# de la pista entera, que obligaba a decodificarla toda).
+import os
+import sys
+import shutil
+import struct
+import threading
+import subprocess
+import numpy as np
+
+try:
+    import mutagen
+except ImportError:
+    mutagen = None
+
+DEFAULT_SAMPLE_RATE = 44100
+RING_SECONDS = 8  # Audio decodificado guardado (por delante y por detrás de la posición)
+HISTORY_SECONDS = 1  # Parte del búfer que se conserva por detrás de la posición
+BLOCK_SAMPLES = 4096  # Muestras por lectura del decodificador
+MIN_PEAK = 1e-4
+
+_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0) if sys.platform == "win32" else 0
+
+
+def read_wav_header(f):
+    """
+    Lee la cabecera RIFF de un WAV PCM y deja f al principio de los datos.
+    Devuelve (canales, sample rate, bytes por muestra, bytes de datos). Se
+    lee a mano porque wave.py (las olas del XMB) tapa al módulo wave.
+    """
+    riff, _, form = struct.unpack("<4sI4s", f.read(12))
+    if riff != b"RIFF" or form != b"WAVE":
+        raise ValueError("no es un archivo WAV")
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError("WAV sin datos")
+        chunk_id, size = struct.unpack("<4sI", header)
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", f.read(16))
+            f.seek(size - 16 + size % 2, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV sin bloque fmt")
+            tag, channels, rate, _, _, bits = fmt
+            if tag not in (1, 0xFFFE):  # PCM o WAVE_FORMAT_EXTENSIBLE
+                raise ValueError(f"WAV con formato {tag} no soportado sin ffmpeg")
+            return channels, rate, bits // 8, size
+        else:
+            f.seek(size + size % 2, os.SEEK_CUR)
+
+
+def probe(path):
+    """(duración en segundos o None, sample rate o None) con mutagen, o ffprobe si no puede."""
+    if mutagen is not None:
+        try:
+            info = mutagen.File(path).info
+            return getattr(info, "length", None) or None, getattr(info, "sample_rate", None) or None
+        except Exception:
+            pass
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe:
+        try:
+            output = subprocess.run(
+                [ffprobe, "-v", "error", "-select_streams", "a:0", "-show_entries", "format=duration:stream=sample_rate",
+                 "-of", "default=noprint_wrappers=1", path],
+                capture_output=True, text=True, timeout=5, creationflags=_NO_WINDOW).stdout
+            values = dict(line.split("=", 1) for line in output.splitlines() if "=" in line)
+            duration = float(values["duration"]) if values.get("duration", "N/A") != "N/A" else None
+            rate = int(values["sample_rate"]) if values.get("sample_rate", "N/A") != "N/A" else None
+            return duration, rate
+        except (OSError, ValueError, subprocess.SubprocessError) as e:
+            print(f"[audio_stream] ffprobe falló con {path}: {e}")
+    return None, None
+
+
+class AudioStream:
+    """
+    PCM mono de path bajo demanda. El consumidor avisa de la posición de
+    reproducción con set_position() y lee ventanas con read(); las muestras
+    se cuentan desde el principio de la pista.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.written = 0  # Muestras decodificadas en total
+        self.position = 0
+        self.peak = MIN_PEAK
+        self.finished = False
+        self.error = None
+        self._process = None
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+
+        blocks = None
+        if shutil.which("ffmpeg"):
+            duration, rate = probe(path)
+            self.sample_rate = rate or DEFAULT_SAMPLE_RATE
+            self.length = int(duration * self.sample_rate) if duration else None  # Se corrige al terminar de decodificar
+            blocks = self._ffmpeg_blocks
+        elif path.lower().endswith(".wav"):
+            try:
+                with open(path, "rb") as f:
+                    channels, self.sample_rate, width, size = read_wav_header(f)
+                self.length = size // (channels * width)
+                blocks = self._wav_blocks
+            except (OSError, ValueError, struct.error) as e:
+                self.error = str(e)
+        else:
+            self.error = "ffmpeg no encontrado"
+        if blocks is None:
+            duration, rate = probe(path)
+            self.sample_rate = rate or DEFAULT_SAMPLE_RATE
+            self.length = int(duration * self.sample_rate) if duration else None
+            self.finished = True
+            print(f"[audio_stream] {os.path.basename(path)} se reproduce sin visualización: {self.error}")
+        self.capacity = RING_SECONDS * self.sample_rate
+        self.ring = np.zeros(self.capacity, dtype=np.float32)
+        if blocks is not None:
+            threading.Thread(target=self._run, args=(blocks,), daemon=True).start()
+
+    # ---------------- DECODIFICADORES ----------------
+    def _ffmpeg_blocks(self):
+        self._process = subprocess.Popen(
+            ["ffmpeg", "-v", "error", "-nostdin", "-i", self.path, "-vn", "-f", "s16le", "-acodec", "pcm_s16le",
+             "-ac", "1", "-ar", str(self.sample_rate), "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, creationflags=_NO_WINDOW)
+        pending = b""
+        while True:
+            data = self._process.stdout.read(BLOCK_SAMPLES * 2)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % 2
+            data, pending = data[:usable], data[usable:]
+            yield np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+        if self._process.wait() != 0 and not self._stop.is_set() and self.written == 0:
+            raise OSError(f"ffmpeg terminó con código {self._process.returncode}")
+
+    def _wav_blocks(self):
+        with open(self.path, "rb") as f:
+            channels, _, width, remaining = read_wav_header(f)
+            if width not in (1, 2, 4):
+                raise ValueError(f"WAV de {width * 8} bits no soportado sin ffmpeg")
+            frame_bytes = channels * width
+            while remaining > 0:
+                data = f.read(min(remaining, BLOCK_SAMPLES * frame_bytes))
+                if not data:
+                    break
+                remaining -= len(data)
+                data = data[:len(data) - len(data) % frame_bytes]
+                if width == 1:
+                    samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+                else:
+                    dtype = "<i2" if width == 2 else "<i4"
+                    samples = np.frombuffer(data, dtype=dtype).astype(np.float32) / float(2 ** (width * 8 - 1))
+                if channels > 1:
+                    samples = samples.reshape(-1, channels).mean(axis=1)  # (L+R)/2
+                yield samples
+
+    def _run(self, blocks):
+        try:
+            for samples in blocks():
+                if not self._write(samples):
+                    return
+        except Exception as e:
+            self.error = str(e)
+            print(f"[audio_stream] No se pudo decodificar {os.path.basename(self.path)}: {e}")
+        finally:
+            with self._cond:
+                self.finished = True
+                if self.error is None and not self._stop.is_set():
+                    self.length = self.written
+            self._close_process()
+
+    def _write(self, samples):
+        """Copia samples al búfer esperando a que haya sitio. False si se cerró el stream."""
+        with self._cond:
+            # Sitio libre: lo que ya queda más de HISTORY_SECONDS por detrás de la posición
+            history = HISTORY_SECONDS * self.sample_rate
+            while self.written + len(samples) > self.position - history + self.capacity and not self._stop.is_set():
+                self._cond.wait(0.25)
+            if self._stop.is_set():
+                return False
+            start = self.written % self.capacity
+            first = min(len(samples), self.capacity - start)
+            self.ring[start:start + first] = samples[:first]
+            self.ring[:len(samples) - first] = samples[first:]
+            self.written += len(samples)
+            if len(samples):
+                self.peak = max(self.peak, float(np.max(np.abs(samples))))
+        return True
+
+    # ---------------- CONSUMIDOR ----------------
+    def set_position(self, position):
+        """Posición de reproducción en muestras; libera sitio para que el hilo siga decodificando."""
+        with self._cond:
+            if position != self.position:
+                self.position = position
+                self._cond.notify()
+
+    def read(self, start, count):
+        """
+        count muestras desde start normalizadas por el pico visto hasta ahora,
+        o None si esa ventana no está en el búfer (aún no decodificada o ya
+        descartada).
+        """
+        with self._cond:
+            if start < 0 or start + count > self.written or start < self.written - self.capacity:
+                return None
+            begin = start % self.capacity
+            if begin + count <= self.capacity:
+                window = self.ring[begin:begin + count].copy()
+            else:
+                window = np.concatenate((self.ring[begin:], self.ring[:begin + count - self.capacity]))
+            peak = self.peak
+        window /= peak
+        return window
+
+    def close(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._close_process()
+
+    def _close_process(self):
+        process = self._process
+        if process is not None and process.poll() is None:
+            try:
+                process.kill()
+                process.wait(timeout=1)
+            except (OSError, subprocess.SubprocessError):
+                pass
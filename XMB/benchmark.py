@@ -0,0 +1,328 @@
+# benchmark.py
+# Banco de pruebas sin ventana: dibuja cada pantalla durante un número fijo de
+# frames con los drivers "dummy" de SDL y devuelve ms/frame (percentiles) y
+# asignaciones de memoria (tracemalloc) en JSON para comparar ejecuciones.
+#
+#   python benchmark.py --frames 120 --resolutions 854x480,1280x720 --output base.json
+#   python benchmark.py --compare base.json --threshold 0.10
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # stdout queda solo para el JSON
+
+import argparse
+import contextlib
+import json
+import math
+import platform
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pygame
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FRAMES = 120
+WARMUP_FRAMES = 10
+ALLOC_FRAMES = 20  # Frames medidos con tracemalloc (va aparte: ralentiza mucho)
+RESOLUTIONS = [(854, 480), (1280, 720), (1920, 1080)]
+FRAME_DT = 1 / 60
+PERCENTILES = [50, 90, 95, 99]
+
+XMB_ITEMS = {
+    "Juegos": ["PS2", "PS3", "PSP"],
+    "Fotos": ["Álbum", "Capturas"],
+    "Música": ["Biblioteca", "Listas"],
+    "Videos": ["Películas", "Clips"],
+    "Ajustes": ["Red", "Pantalla", "Sonido", "Themes"]
+}
+
+
+def load_font():
+    try:
+        return pygame.font.Font("FOT-NewRodin Pro DB.otf", 22)
+    except Exception:
+        return pygame.font.SysFont(None, 22)
+
+
+def write_test_wav(path, seconds=10.0, rate=44100):
+    """WAV estéreo de 16 bits con dos tonos (se escribe a mano: wave.py tapa al módulo wave)."""
+    t = np.arange(int(seconds * rate)) / rate
+    left = 0.6 * np.sin(2 * math.pi * 220 * t) + 0.2 * np.sin(2 * math.pi * 1760 * t)
+    right = 0.6 * np.sin(2 * math.pi * 330 * t)
+    pcm = (np.stack([left, right], axis=1) * 32767).astype("<i2").tobytes()
+    header = struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + len(pcm), b"WAVE", b"fmt ", 16,
+                         1, 2, rate, rate * 4, 4, 16, b"data", len(pcm))
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(pcm)
+
+
+# ---------------- ESCENARIOS ----------------
+# Cada escenario recibe (screen, font, tmp_dir) y devuelve frame(i) -> None.
+# Si deja algo en marcha (hilos, procesos), frame.close() lo detiene al terminar.
+
+def scenario_cosmic_wave(screen, font, tmp_dir):
+    from wave import CosmicWave
+    wave = CosmicWave(*screen.get_size())
+    wave.lod = None  # Malla fija para que las ejecuciones sean comparables
+
+    def frame(i):
+        wave.update()
+        wave.draw(screen)
+    return frame
+
+
+def raster_backend_scenario(backend):
+    """CosmicWave dibujando siempre la malla en vivo con el backend de rasterizado indicado."""
+    def scenario(screen, font, tmp_dir):
+        from wave import CosmicWave
+        wave = CosmicWave(*screen.get_size())
+        wave.lod = None
+        wave.raster_backend = backend
+        wave.draw_from_loop_cache = lambda target: False  # Sin caché del bucle: se mide el rasterizado
+
+        def frame(i):
+            wave.update()
+            wave.draw(screen)
+        return frame
+    return scenario
+
+
+def scenario_xmb_menu(screen, font, tmp_dir):
+    from xmbparte2 import XMBMenu
+    menu = XMBMenu(screen, font, XMB_ITEMS)
+
+    def frame(i):
+        menu.update(FRAME_DT)
+        menu.draw_menu()
+    return frame
+
+
+def scenario_screen_settings(screen, font, tmp_dir):
+    from screen import ScreenSettings
+    from wave import build_waves
+    settings = ScreenSettings(screen, font)
+    W, H = screen.get_size()
+    waves = build_waves(W, H, threaded=False)
+
+    def frame(i):
+        settings.update(FRAME_DT)
+        settings.draw(waves, W, H, i * FRAME_DT)
+    return frame
+
+
+def scenario_theme_settings(screen, font, tmp_dir):
+    from theme import ThemeSettings
+    settings = ThemeSettings(screen, font)
+    settings.start_animation()
+    W, H = screen.get_size()
+
+    def frame(i):
+        settings.update(FRAME_DT)
+        settings.draw(W, H, i * FRAME_DT)
+    return frame
+
+
+def scenario_reloj(screen, font, tmp_dir):
+    import reloj
+
+    def frame(i):
+        screen.fill(reloj.COLOR_BG)
+        reloj.draw_fondo(screen)
+        reloj.draw_reloj(screen)
+    return frame
+
+
+def scenario_warning(screen, font, tmp_dir):
+    from warning_screen import create_warning_waves, draw_warning_frame
+    waves = create_warning_waves(screen.get_height())
+
+    def frame(i):
+        draw_warning_frame(screen, font, waves, i * FRAME_DT)
+    return frame
+
+
+def scenario_user_input(screen, font, tmp_dir):
+    from user_input_screen import UserInputScreen
+    input_screen = UserInputScreen(font)
+
+    def frame(i):
+        input_screen.draw(screen)
+    return frame
+
+
+def scenario_music_visualizer(screen, font, tmp_dir):
+    from music import MusicVisualizer  # Necesita mutagen: ImportError -> se omite
+    song_path = os.path.join(tmp_dir, "benchmark_tone.wav")
+    if not os.path.isfile(song_path):
+        write_test_wav(song_path)
+    player = MusicVisualizer(screen, song_path)
+    if not player.is_running():
+        raise RuntimeError("MusicVisualizer no pudo cargar la pista de prueba")
+    modes = ["wave", "dots", "bars", "futiger_aero"]
+
+    def frame(i):
+        player.visualization_mode = modes[(i // 30) % len(modes)]  # Recorrer todos los modos
+        player.update(FRAME_DT)
+        player.draw()
+    frame.close = player.stop  # Hilo decodificador (y ffmpeg)
+    return frame
+
+
+SCENARIOS = {
+    "cosmic_wave": scenario_cosmic_wave,
+    "raster_gfxdraw": raster_backend_scenario("gfxdraw"),
+    "raster_numpy": raster_backend_scenario("numpy"),
+    "xmb_menu": scenario_xmb_menu,
+    "screen_settings": scenario_screen_settings,
+    "theme_settings": scenario_theme_settings,
+    "reloj": scenario_reloj,
+    "warning": scenario_warning,
+    "user_input": scenario_user_input,
+    "music_visualizer": scenario_music_visualizer,
+}
+
+
+# ---------------- MEDICIÓN ----------------
+
+def summarize(times_ms):
+    arr = np.array(times_ms)
+    summary = {f"p{p}": round(float(np.percentile(arr, p)), 3) for p in PERCENTILES}
+    summary["mean"] = round(float(arr.mean()), 3)
+    summary["max"] = round(float(arr.max()), 3)
+    return summary
+
+
+def measure(frame, frames):
+    for i in range(WARMUP_FRAMES):
+        frame(i)
+    times = []
+    for i in range(WARMUP_FRAMES, WARMUP_FRAMES + frames):
+        start = time.perf_counter()
+        frame(i)
+        times.append((time.perf_counter() - start) * 1000)
+
+    # Asignaciones: pico por frame y crecimiento neto durante la pasada
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    peaks = []
+    for i in range(ALLOC_FRAMES):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        frame(WARMUP_FRAMES + frames + i)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    alloc = {
+        "peak_kb_per_frame_p50": round(float(np.percentile(peaks, 50)) / 1024, 1),
+        "peak_kb_per_frame_max": round(max(peaks) / 1024, 1),
+        "net_kb": round((current - base) / 1024, 1),
+    }
+    return summarize(times), alloc
+
+
+def run(scenario_names, resolutions, frames):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for W, H in resolutions:
+            screen = pygame.display.set_mode((W, H))
+            font = load_font()
+            for name in scenario_names:
+                entry = {"scenario": name, "resolution": f"{W}x{H}", "frames": frames}
+                frame = None
+                try:
+                    frame = SCENARIOS[name](screen, font, tmp_dir)
+                    entry["ms"], entry["alloc"] = measure(frame, frames)
+                except ImportError as e:
+                    entry["skipped"] = f"falta una dependencia: {e}"
+                except Exception as e:
+                    entry["error"] = f"{type(e).__name__}: {e}"
+                finally:
+                    close = getattr(frame, "close", None)
+                    if close is not None:
+                        close()
+                print(f"[benchmark] {name} {W}x{H}: {entry.get('ms', entry.get('skipped', entry.get('error')))}", file=sys.stderr)
+                results.append(entry)
+            pygame.mixer.quit()  # MusicVisualizer inicializa el mixer a su frecuencia
+    return results
+
+
+def compare(results, baseline, threshold, metric="p50"):
+    """Devuelve las entradas cuyo metric empeoró más de threshold (fracción) respecto a baseline."""
+    previous = {(r["scenario"], r["resolution"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for entry in results:
+        old = previous.get((entry["scenario"], entry["resolution"]))
+        if not old or "ms" not in old or "ms" not in entry:
+            continue
+        before, after = old["ms"][metric], entry["ms"][metric]
+        if before > 0 and (after - before) / before > threshold:
+            regressions.append({"scenario": entry["scenario"], "resolution": entry["resolution"],
+                                "metric": metric, "before": before, "after": after})
+    return regressions
+
+
+def parse_resolutions(text):
+    return [tuple(int(v) for v in item.lower().split("x")) for item in text.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sin ventana de las pantallas del XMB")
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    parser.add_argument("--resolutions", default=",".join(f"{w}x{h}" for w, h in RESOLUTIONS))
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--output", help="Fichero JSON de salida (por defecto stdout)")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Empeoramiento tolerado (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    names = [n for n in args.scenarios.split(",") if n]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"escenarios desconocidos: {', '.join(unknown)}")
+
+    os.chdir(BASE_DIR)  # Las pantallas cargan imágenes/sonidos con rutas relativas
+    sys.path.insert(0, BASE_DIR)
+    pygame.init()
+
+    # Los módulos imprimen mucho por stdout: se desvía a stderr para no ensuciar el JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run(names, parse_resolutions(args.resolutions), args.frames)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "frames": args.frames,
+            "warmup_frames": WARMUP_FRAMES,
+            "alloc_frames": ALLOC_FRAMES,
+        },
+        "results": results,
+    }
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(results, json.load(f), args.threshold)
+        exit_code = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    pygame.quit()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# compositor.py
+# Compositor de capas retenidas para el XMB. El fondo (olas) y cada capa del
+# menú (barra horizontal, lista vertical, submenú, HUD) viven en superficies
+# propias; una capa solo se vuelve a dibujar cuando cambia su clave, y la
+# pantalla solo se recompone y actualiza en los rectángulos que cambiaron
+# (pygame.display.update(rects)) cuando el fondo no ha avanzado.
+import pygame
+
+LAYER_ORDER = ["categories", "list", "submenu", "hud"]
+FULL_UPDATE_RATIO = 0.5  # Si lo sucio supera esta fracción de la pantalla se actualiza entera
+
+
+def premultiplied(source):
+    """Copia de source con alfa premultiplicado (incluye el alfa de superficie de set_alpha)."""
+    alpha = source.get_alpha()
+    # convert_alpha: copia en formato de pantalla (premul_alpha() falla sobre las superficies de font.render)
+    result = source.convert_alpha().premul_alpha()
+    if alpha < 255:
+        result.set_alpha(255)
+        result.fill((alpha, alpha, alpha, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+    return result
+
+
+def merge_rects(rects):
+    """Une los rectángulos que se solapan (recomponer dos veces una zona la oscurecería)."""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class LayerSurface(pygame.Surface):
+    """
+    Superficie de capa con alfa premultiplicado que recuerda el rectángulo de
+    cada blit. Premultiplicar hace que las capas se compongan sobre el fondo
+    igual que si se hubiera dibujado directamente (el blit normal sobre una
+    superficie transparente oscurece los bordes del texto).
+    """
+    def __init__(self, size):
+        super().__init__(size, pygame.SRCALPHA)
+        self.drawn = []
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        if not special_flags and source.get_alpha() is not None:
+            # Sin alfa (opacas o con colorkey) el blit normal ya es correcto
+            source, special_flags = premultiplied(source), pygame.BLEND_PREMULTIPLIED
+        rect = super().blit(source, dest, area, special_flags)
+        self.drawn.append(rect)
+        return rect
+
+
+class Layer:
+    def __init__(self, name, size):
+        self.name = name
+        self.surface = LayerSurface(size)
+        self.key = None
+        self.result = None  # Valor devuelto por el último render (p. ej. drawn_rects)
+        self.rects = []  # Zonas con contenido
+        self.used = False
+
+
+class Compositor:
+    def __init__(self, screen):
+        self.size = screen.get_size()
+        self.background = pygame.Surface(self.size).convert()
+        self.background_id = None
+        self.layers = {}
+        self.dirty = []
+        self.full = True
+        self.renders = 0  # Capas redibujadas en el último frame
+
+    def resize(self, size):
+        self.size = size
+        self.background = pygame.Surface(size).convert()
+        self.background_id = None
+        self.layers = {}
+        self.full = True
+
+    def begin_frame(self, screen):
+        if screen.get_size() != self.size:
+            self.resize(screen.get_size())
+        for layer in self.layers.values():
+            layer.used = False
+        self.dirty = []
+        self.renders = 0
+
+    def invalidate(self):
+        """Fuerza una recomposición completa (p. ej. al volver de otra pantalla)."""
+        self.full = True
+        self.background_id = None
+        for layer in self.layers.values():
+            layer.key = None
+
+    # ---------------- FONDO ----------------
+    def draw_background(self, wave, *args):
+        """Dibuja la ola en el fondo solo si tiene un frame nuevo (ThreadedWave.frame_id)."""
+        frame_id = getattr(wave, "frame_id", None)
+        if frame_id is not None and frame_id == self.background_id:
+            return False
+        wave.draw(self.background, *args)
+        self.background_id = frame_id
+        self.full = True
+        return True
+
+    # ---------------- CAPAS ----------------
+    def layer(self, name, key, render):
+        """
+        Devuelve el resultado de render(surface) para la capa name. Solo se
+        vuelve a dibujar si key cambia (key=None obliga a dibujar siempre).
+        render dibuja en coordenadas de pantalla sobre una capa transparente.
+        """
+        layer = self.layers.get(name)
+        if layer is None:
+            layer = self.layers[name] = Layer(name, self.size)
+        layer.used = True
+        if key is not None and key == layer.key:
+            return layer.result
+        surface = layer.surface
+        for rect in layer.rects:
+            surface.fill((0, 0, 0, 0), rect)
+        surface.drawn = []
+        layer.result = render(surface)
+        self.dirty.extend(layer.rects)
+        layer.rects = merge_rects(r for r in surface.drawn if r.width and r.height)
+        self.dirty.extend(layer.rects)
+        layer.key = key
+        self.renders += 1
+        return layer.result
+
+    def _ordered_layers(self):
+        names = LAYER_ORDER + [n for n in self.layers if n not in LAYER_ORDER]
+        return [self.layers[n] for n in names if n in self.layers]
+
+    def compose(self, screen):
+        """Recompone lo necesario sobre screen y devuelve los rects a actualizar."""
+        layers = self._ordered_layers()
+        for layer in layers:
+            if not layer.used and layer.rects:
+                # La capa dejó de mostrarse: limpiar su zona
+                self.dirty.extend(layer.rects)
+                layer.rects = []
+                layer.key = None
+
+        screen_rect = screen.get_rect()
+        dirty = merge_rects(r.clip(screen_rect) for r in self.dirty if r.colliderect(screen_rect))
+        if not self.full and dirty:
+            area = sum(r.width * r.height for r in dirty)
+            if area > FULL_UPDATE_RATIO * screen_rect.width * screen_rect.height:
+                self.full = True
+
+        if self.full:
+            screen.blit(self.background, (0, 0))
+            for layer in layers:
+                if layer.used:
+                    for rect in layer.rects:
+                        screen.blit(layer.surface, rect, rect, pygame.BLEND_PREMULTIPLIED)
+            self.full = False
+            return [screen_rect]
+
+        for area in dirty:
+            screen.blit(self.background, area, area)
+            for layer in layers:
+                if not layer.used:
+                    continue
+                for rect in layer.rects:
+                    clip = rect.clip(area)
+                    if clip.width and clip.height:
+                        screen.blit(layer.surface, clip, clip, pygame.BLEND_PREMULTIPLIED)
+        return dirty
+
+
+def present(rects, partial=True):
+    """Actualiza la pantalla: solo rects si el backend lo permite, si no flip()."""
+    surface = pygame.display.get_surface()
+    if partial and surface is not None and not surface.get_flags() & pygame.OPENGL:
+        if rects:
+            pygame.display.update(rects)
+    else:
+        pygame.display.flip()
@@ -1,8 +1,21 @@
 import pygame
+import pygame.gfxdraw
 import numpy as np
 import math
+import sys
 import time
 
+import wave
+from wave import FlowEngine, LightMap, MeshLODGovernor, MeshRasterizer, generate_flow_mesh, quad_index_table
+from utils import get_gradient
+
+# Motor único de Cosmic Flow: los antiguos "cosmicflow NORMAL.py",
+# "cosmicflow brillante.py", "cosmicflow copia.py" y "cosmicflow copia.puntitospy"
+# son ahora lanzadores de un estilo de STYLE_PRESETS.
+# Comparte con CosmicWave (wave.py) el núcleo vectorizado (FlowEngine), la
+# velocidad táctil, la escala interna de render (RENDER_SCALE), el backend de
+# rasterizado (RASTER_BACKEND), el mapa de luz y el nivel de detalle adaptativo.
+
 WIDTH, HEIGHT = 800, 600
 FPS = 60
 
@@ -10,155 +23,177 @@ MESH_SIZE = 100
 BASE_ANIMATION_SPEED = 0.6
 AMPLITUDE = 8
 
-FOV = 256
 CAMERA_DISTANCE = 70
 
-# Color rosa translúcido (RGBA)
-PINK_COLOR = (255, 105, 180, 120)  # Hot pink con alpha 120
-
 BACKGROUND_COLOR = (10, 10, 30)
 
-ANIMATION_SPEED_MAX = 1.0
-ANIMATION_SPEED_MIN = 0.5
-TOUCH_ACCEL_DURATION = 3.0
-
-animation_speed_factor = ANIMATION_SPEED_MIN
-last_touch_time = None
-
-
-def rotate_x(point, angle_rad):
-    x, y, z = point
-    cos_ang = math.cos(angle_rad)
-    sin_ang = math.sin(angle_rad)
-    y_new = y * cos_ang - z * sin_ang
-    z_new = y * sin_ang + z * cos_ang
-    return [x, y_new, z_new]
-
-
-def rotate_y(point, angle_rad):
-    x, y, z = point
-    cos_ang = math.cos(angle_rad)
-    sin_ang = math.sin(angle_rad)
-    x_new = x * cos_ang + z * sin_ang
-    z_new = -x * sin_ang + z * cos_ang
-    return [x_new, y, z_new]
-
-
-def project_point(x, y, z):
-    factor = FOV / (CAMERA_DISTANCE + z)
-    px = WIDTH // 2 + int(x * factor)
-    py = HEIGHT // 2 - int(y * factor)
-    return px, py
-
-
-def generate_flow_mesh(size):
-    points = []
-    for i in range(size):
-        for j in range(size):
-            x = (i - size / 2)
-            y = (j - size / 2) * 0.7
-            z = 0
-            points.append([x, y, z])
-    return np.array(points, dtype=np.float32)
-
-
-def update_flow(points, time_sec, speed_factor=1.0):
-    for idx, (x, y, z) in enumerate(points):
-        z_new = (
-            math.sin((x * 0.4 + time_sec * speed_factor)) +
-            math.cos((y * 0.6 + time_sec * speed_factor * 0.5)) +
-            math.sin((x * 0.3 + y * 0.3 + time_sec * speed_factor * 0.7))
-        ) * AMPLITUDE
-        points[idx][2] = z_new
-
-
-def draw_flow(screen, points, size, angle_x_rad, angle_y_rad, flow_surface):
-    flow_surface.fill((0, 0, 0, 0))  # Limpiar superficie con transparencia
-
-    for i in range(size - 1):
-        for j in range(size - 1):
-            idx = i * size + j
-
-            # Obtener 4 puntos vecinos para un rectángulo
-            p0 = points[idx]
-            p1 = points[idx + 1]
-            p2 = points[idx + size]
-            p3 = points[idx + size + 1]
-
-            # Rotar cada punto
-            p0r = rotate_y(rotate_x(p0, angle_x_rad), angle_y_rad)
-            p1r = rotate_y(rotate_x(p1, angle_x_rad), angle_y_rad)
-            p2r = rotate_y(rotate_x(p2, angle_x_rad), angle_y_rad)
-            p3r = rotate_y(rotate_x(p3, angle_x_rad), angle_y_rad)
-
-            # Proyectar a 2D
-            pp0 = project_point(*p0r)
-            pp1 = project_point(*p1r)
-            pp2 = project_point(*p2r)
-            pp3 = project_point(*p3r)
-
-            # Dibujar dos triángulos para formar el rectángulo rellenado
-            pygame.gfxdraw.filled_trigon(flow_surface, pp0[0], pp0[1], pp1[0], pp1[1], pp2[0], pp2[1], PINK_COLOR)
-            pygame.gfxdraw.filled_trigon(flow_surface, pp1[0], pp1[1], pp2[0], pp2[1], pp3[0], pp3[1], PINK_COLOR)
-
-    screen.blit(flow_surface, (0, 0))
-
-
-def handle_touch():
-    global animation_speed_factor, last_touch_time
-    animation_speed_factor = ANIMATION_SPEED_MAX
-    last_touch_time = time.time()
-
-
-def update_animation_speed():
-    global animation_speed_factor, last_touch_time
-    if last_touch_time is None:
-        animation_speed_factor = ANIMATION_SPEED_MIN
-        return
-    elapsed = time.time() - last_touch_time
-    if elapsed > TOUCH_ACCEL_DURATION:
-        animation_speed_factor = ANIMATION_SPEED_MIN
-    else:
-        progress = elapsed / TOUCH_ACCEL_DURATION
-        animation_speed_factor = ANIMATION_SPEED_MAX - (ANIMATION_SPEED_MAX - ANIMATION_SPEED_MIN) * progress
-
-
-def main():
-    global animation_speed_factor
-
+# 🎨 Estilos (mode: "trigons" = superficie rellena, "points" = un círculo por vértice)
+# "bright" no viene de los archivos antiguos (los tres de superficie eran idénticos):
+# es la superficie con mezcla aditiva, solo disponible eligiéndolo por nombre.
+STYLE_PRESETS = {
+    "normal": {"mode": "trigons", "color": (255, 105, 180, 120), "rotate_y_speed": 0.002, "blend": 0},
+    "static": {"mode": "trigons", "color": (255, 105, 180, 120), "rotate_y_speed": 0.0, "blend": 0},
+    "bright": {"mode": "trigons", "color": (255, 105, 180, 120), "rotate_y_speed": 0.002, "blend": pygame.BLEND_RGB_ADD},
+    "points": {"mode": "points", "color": (255, 105, 180, 100), "rotate_y_speed": 0.002, "blend": 0, "radius": 3},
+}
+DEFAULT_STYLE = "normal"
+
+
+def scaled_cosmicflow_mesh(size):
+    """Malla de size x size con la misma extensión que la de MESH_SIZE (para el LOD)."""
+    stretch = MESH_SIZE / size
+    return generate_flow_mesh(size, stretch_x=1.0 * stretch, stretch_y=0.7 * stretch)
+
+
+class CosmicFlow:
+    """
+    Superficie Cosmic Flow con un estilo de STYLE_PRESETS.
+    themed=True la integra como ola de fondo del XMB: gradiente y color de la
+    malla salen del preset de color actual de wave.py (con el alfa del estilo)
+    y los quads se iluminan con el LightMap, igual que CosmicWave. Sin tema,
+    cada estilo usa su color plano, como los archivos originales.
+    """
+    def __init__(self, width, height, style=DEFAULT_STYLE, themed=False, mesh_size=MESH_SIZE):
+        if style not in STYLE_PRESETS:
+            print(f"[CosmicFlow] Estilo desconocido '{style}', usando '{DEFAULT_STYLE}'")
+            style = DEFAULT_STYLE
+        self.style = style
+        self.preset = STYLE_PRESETS[style]
+        self.themed = themed
+        self.width = width
+        self.height = height
+        self.angle_x = math.radians(85)
+        self.angle_y = 0.0
+        self.flow_time = 0.0
+        self.flow_speed = wave.animation_speed_factor
+        self.set_mesh_size(mesh_size)
+        # Los puntos no tienen quads: menos vértices cambiaría el dibujo, no solo su densidad
+        self.lod = MeshLODGovernor(self.size) if wave.ADAPTIVE_LOD and self.preset["mode"] == "trigons" else None
+        self.light_map = LightMap() if themed else None
+        self.rasterizer = MeshRasterizer()
+        self.gradient_surface = None
+        self.allocate_surfaces()
+        self.start_time = time.time()
+
+    def allocate_surfaces(self):
+        """(Re)crea las superficies de render según el tamaño y wave.RENDER_SCALE."""
+        self.render_scale = wave.RENDER_SCALE
+        self.render_size = (max(1, int(self.width * self.render_scale)), max(1, int(self.height * self.render_scale)))
+        self.flow_surface = pygame.Surface(self.render_size, pygame.SRCALPHA)
+        if self.render_scale < 1.0:
+            self.render_surface = pygame.Surface(self.render_size)
+            self.upscale_surface = pygame.Surface((self.width, self.height))
+        else:
+            self.render_surface = None
+            self.upscale_surface = None
+        self.update_gradient()
+
+    def update_gradient(self):
+        if self.themed:
+            self.gradient_surface = get_gradient(self.render_size, wave.BG_TOP, wave.BG_BOTTOM)
+
+    def set_mesh_size(self, size):
+        """Regenera la malla con otra resolución conservando su extensión."""
+        self.size = size
+        self.points = scaled_cosmicflow_mesh(size)
+        self.flow_engine = FlowEngine(self.points, amplitude=AMPLITUDE, camera_distance=CAMERA_DISTANCE)
+        self.quads = quad_index_table(size)
+        self.flow_engine.update(self.flow_time, speed_factor=self.flow_speed)
+
+    def color(self):
+        if self.themed:
+            return wave.PINK_COLOR[:3] + (self.preset["color"][3],)
+        return self.preset["color"]
+
+    def update(self):
+        elapsed_time = (time.time() - self.start_time) * BASE_ANIMATION_SPEED
+        wave.update_animation_speed()
+        self.flow_time = elapsed_time
+        self.flow_speed = wave.animation_speed_factor
+        self.flow_engine.update(elapsed_time, speed_factor=wave.animation_speed_factor)
+        self.angle_y += self.preset["rotate_y_speed"]
+
+    def draw(self, surface, *args, **kwargs):
+        if surface.get_size() != (self.width, self.height) or self.render_scale != wave.RENDER_SCALE:
+            self.width, self.height = surface.get_size()
+            self.allocate_surfaces()
+        target = surface if self.render_surface is None else self.render_surface
+        if self.themed:
+            target.blit(self.gradient_surface, (0, 0))
+        else:
+            target.fill(BACKGROUND_COLOR)
+
+        mesh_time = self.draw_mesh(target)
+
+        if self.render_surface is not None:
+            pygame.transform.smoothscale(self.render_surface, (self.width, self.height), self.upscale_surface)
+            surface.blit(self.upscale_surface, (0, 0))
+        if self.lod is not None:
+            new_size = self.lod.record(mesh_time * 1000)
+            if new_size is not None:
+                self.set_mesh_size(new_size)
+                print(f"[CosmicFlow] Mesh LOD -> {new_size}x{new_size}")
+
+    def draw_mesh(self, target):
+        """Dibuja la malla sobre target. Devuelve los segundos de proyección + rasterizado."""
+        render_w, render_h = self.render_size
+        flow_surface = self.flow_surface
+        flow_surface.fill((0, 0, 0, 0))  # Limpiar con transparencia
+        start = time.perf_counter()
+        projected = self.flow_engine.project(self.angle_x, render_w, render_h, self.render_scale, angle_y_rad=self.angle_y)
+        color = self.color()
+        layer = flow_surface
+        if self.preset["mode"] == "points":
+            circle = pygame.draw.circle
+            radius = max(1, round(self.preset["radius"] * self.render_scale))
+            for point in projected.tolist():
+                circle(flow_surface, color, point, radius)
+        else:
+            corners = projected[self.quads]  # (Q, 4, 2) en orden p0, p1, p3, p2
+            light_map = self.light_map
+            if light_map is not None:
+                centers = corners.sum(axis=1) // 4
+                light_map.ensure(render_w, render_h, color, self.render_scale)
+            if wave.RASTER_BACKEND == "numpy":
+                self.rasterizer.ensure(render_w, render_h)
+                if light_map is not None:
+                    colors = light_map.palette_rgb[light_map.levels_at(centers[:, 0], centers[:, 1])]
+                else:
+                    colors = np.broadcast_to(np.array(color[:3], dtype=np.float64), (len(corners), 3))
+                layer = self.rasterizer.draw(corners, colors, color[3])
+            else:
+                colors = light_map.colors(centers[:, 0], centers[:, 1]) if light_map is not None else [color] * len(corners)
+                # Dos triángulos por quad: (p0, p1, p2) y (p1, p2, p3); en gfxdraw es más rápido que un polígono
+                trigon = pygame.gfxdraw.filled_trigon
+                for (x0, y0, x1, y1, x3, y3, x2, y2), quad_color in zip(corners.reshape(-1, 8).tolist(), colors):
+                    trigon(flow_surface, x0, y0, x1, y1, x2, y2, quad_color)
+                    trigon(flow_surface, x1, y1, x2, y2, x3, y3, quad_color)
+        mesh_time = time.perf_counter() - start
+        target.blit(layer, (0, 0), special_flags=self.preset["blend"])
+        return mesh_time
+
+    def close(self):
+        pass
+
+
+def run(style=DEFAULT_STYLE):
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("Cosmic Flow con superficie rosa translúcida")
+    pygame.display.set_caption(f"Cosmic Flow ({style})")
     clock = pygame.time.Clock()
 
-    points = generate_flow_mesh(MESH_SIZE)
-
-    # Superficie con canal alfa para dibujar poligonos translucidos
-    global flow_surface
-    flow_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-
-    angle_x_rad = math.radians(85)
-    angle_y_rad = 0
+    flow = CosmicFlow(WIDTH, HEIGHT, style)
 
     running = True
-    start_time = time.time()
-
     while running:
-        elapsed_time = (time.time() - start_time) * BASE_ANIMATION_SPEED
-
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                handle_touch()
+                wave.handle_touch()
 
-        update_animation_speed()
-        update_flow(points, elapsed_time, speed_factor=animation_speed_factor)
-
-        angle_y_rad += 0.002
-
-        screen.fill(BACKGROUND_COLOR)
-        draw_flow(screen, points, MESH_SIZE, angle_x_rad, angle_y_rad, flow_surface)
+        flow.update()
+        flow.draw(screen)
 
         pygame.display.flip()
         clock.tick(FPS)
@@ -166,8 +201,5 @@ def main():
     pygame.quit()
 
 
-# Necesita importar pygame.gfxdraw para rellenar triángulos
-import pygame.gfxdraw
-
 if __name__ == "__main__":
-    main()
+    run(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_STYLE)
@@ -0,0 +1,132 @@
+# dircache.py
+# Caché en disco de los listados del gestor de archivos, entre sesiones.
+# Cada carpeta guarda su última instantánea (entradas con su tipo de medio)
+# junto al mtime de la carpeta cuando se listó: al volver a abrirla la lista
+# aparece desde la caché y DirectoryLoader solo vuelve a leer la carpeta si
+# su mtime ha cambiado.
+#
+# Se guarda en una base SQLite bajo el directorio de caché del usuario
+# (XMB_CACHE_DIR o $XDG_CACHE_HOME/xmb); cada instantánea va en una fila como
+# JSON comprimido con zlib (no marshal: su formato cambia entre versiones de
+# Python y la caché sobrevive a una actualización). Si el total supera CACHE_MAX_BYTES se borran las
+# carpetas usadas hace más tiempo. Las funciones se llaman desde el hilo del
+# cargador: cada llamada abre su propia conexión.
+import os
+import time
+import json
+import zlib
+
+try:
+    import sqlite3
+except ImportError:
+    print("[dircache] sqlite3 no disponible: los listados no se guardarán entre sesiones")
+    sqlite3 = None
+
+CACHE_DIR = os.environ.get("XMB_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "xmb")
+CACHE_FILE = os.path.join(CACHE_DIR, "listings.sqlite3")
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+FORMAT_VERSION = 2  # Cambiarlo invalida las instantáneas guardadas con otro formato
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    path TEXT PRIMARY KEY,
+    dir_mtime INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    used REAL NOT NULL,
+    data BLOB NOT NULL
+)
+"""
+_ready = False  # Esquema creado en esta sesión
+
+
+def _connect():
+    global _ready
+    if sqlite3 is None:
+        return None
+    try:
+        if not _ready:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+        connection = sqlite3.connect(CACHE_FILE, timeout=2.0)
+        connection.execute("PRAGMA synchronous = OFF")  # Es una caché: perderla solo cuesta volver a listar
+        if not _ready:
+            connection.execute(_SCHEMA)
+            _ready = True
+        return connection
+    except (OSError, sqlite3.Error) as e:
+        print(f"[dircache] No se pudo abrir {CACHE_FILE}: {e}")
+        return None
+
+
+def directory_mtime(path):
+    """mtime de la carpeta en ns (lo que valida la instantánea), o None."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def load(path):
+    """Devuelve (mtime_ns, [(nombre, is_dir, size, mtime, kind), ...]) o None si no está."""
+    connection = _connect()
+    if connection is None:
+        return None
+    try:
+        row = connection.execute("SELECT dir_mtime, data FROM listings WHERE path = ? AND version = ?",
+                                 (path, FORMAT_VERSION)).fetchone()
+        if row is None:
+            return None
+        rows = json.loads(zlib.decompress(row[1]))
+        if not isinstance(rows, list) or not all(isinstance(entry, list) and len(entry) == 5 for entry in rows):
+            raise ValueError("filas con formato inesperado")
+        return row[0], rows
+    except (sqlite3.Error, zlib.error, ValueError, TypeError) as e:
+        print(f"[dircache] Instantánea no válida para {path}: {e}")
+        return None
+    finally:
+        connection.close()
+
+
+def touch(path):
+    """Marca path como usado ahora (las menos usadas son las primeras en borrarse)."""
+    connection = _connect()
+    if connection is None:
+        return
+    try:
+        with connection:
+            connection.execute("UPDATE listings SET used = ? WHERE path = ?", (time.time(), path))
+    except sqlite3.Error as e:
+        print(f"[dircache] No se pudo actualizar {path}: {e}")
+    finally:
+        connection.close()
+
+
+def store(path, dir_mtime, entries):
+    """Guarda la instantánea de path (entries: FileEntry o tuplas equivalentes)."""
+    connection = _connect()
+    if connection is None:
+        return
+    try:
+        data = zlib.compress(json.dumps([tuple(entry) for entry in entries], separators=(",", ":")).encode("ascii"), 6)
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?)",
+                               (path, dir_mtime, FORMAT_VERSION, time.time(), data))
+            _trim(connection)
+    except (sqlite3.Error, ValueError) as e:
+        print(f"[dircache] No se pudo guardar {path}: {e}")
+    finally:
+        connection.close()
+
+
+def _trim(connection):
+    total = connection.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM listings").fetchone()[0]
+    if total <= CACHE_MAX_BYTES:
+        return
+    stale = []
+    for path, size in connection.execute("SELECT path, LENGTH(data) FROM listings ORDER BY used"):
+        if total <= CACHE_MAX_BYTES:
+            break
+        stale.append((path,))
+        total -= size
+    connection.executemany("DELETE FROM listings WHERE path = ?", stale)
+
@@ -0,0 +1,402 @@
+# files.py
+# Listado de directorios para el gestor de archivos del XMB. Cada entrada se
+# lee una sola vez con os.scandir (que ya trae el tipo y, en la mayoría de
+# sistemas, los datos de stat) y se guarda en un registro compacto; el dibujo
+# solo consulta ese registro, sin llamadas a os.path.isfile/isdir por frame.
+#
+# DirectoryLoader lista en un hilo aparte y entrega las entradas por bloques;
+# cada carga lleva un número de generación y las de cargas anteriores (el
+# usuario ya navegó a otra carpeta) se cancelan y se descartan. Si la carpeta
+# está en dircache, la instantánea guardada se entrega primero y solo se
+# vuelve a leer la carpeta cuando su mtime ya no coincide.
+#
+# DirectoryModel guarda el listado ordenado (carpetas primero, orden natural)
+# con un índice de texto para saltar tecleando, buscar por subcadena y
+# filtrar sin recorrer toda la carpeta.
+import os
+import re
+import time
+import bisect
+from operator import itemgetter
+from itertools import accumulate
+from stat import S_ISDIR
+import queue
+import threading
+from collections import namedtuple
+
+import dircache
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".aac", ".wma")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp")
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov", ".webm")
+
+FIRST_CHUNK = 64  # Primer bloque pequeño: la lista aparece enseguida
+CHUNK_SIZE = 512
+CHUNK_INTERVAL = 0.05  # Segundos máximos antes de entregar un bloque incompleto
+POLL_MAX_ENTRIES = 1024  # Entradas aplicadas por frame como mucho
+
+SORT_MODES = ("name", "type")
+KIND_ORDER = {"folder": "0", "audio": "1", "image": "2", "video": "3", "file": "4"}
+NATURAL_DIGITS = 20  # Ancho al que se rellenan los números para el orden natural
+_DIGITS = re.compile(r"\d+")
+
+# kind: "folder", "audio", "image", "video" o "file"
+FileEntry = namedtuple("FileEntry", "name is_dir size mtime kind")
+
+
+def detect_kind(name, is_dir):
+    if is_dir:
+        return "folder"
+    lower = name.lower()
+    if lower.endswith(AUDIO_EXTENSIONS):
+        return "audio"
+    if lower.endswith(IMAGE_EXTENSIONS):
+        return "image"
+    if lower.endswith(VIDEO_EXTENSIONS):
+        return "video"
+    return "file"
+
+
+def make_entry(dir_entry):
+    """FileEntry a partir de un os.DirEntry (los enlaces rotos quedan como archivo de tamaño 0)."""
+    try:
+        is_dir = dir_entry.is_dir()
+    except OSError:
+        is_dir = False
+    try:
+        stat = dir_entry.stat()
+        size, mtime = (0 if is_dir else stat.st_size), stat.st_mtime
+    except OSError:
+        size, mtime = 0, 0.0
+    return FileEntry(dir_entry.name, is_dir, size, mtime, detect_kind(dir_entry.name, is_dir))
+
+
+def entry_from_path(path):
+    """FileEntry de una sola ruta (para los cambios que avisa fswatch), o None si ya no existe."""
+    name = os.path.basename(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        if not os.path.lexists(path):
+            return None
+        return FileEntry(name, False, 0, 0.0, detect_kind(name, False))  # Enlace roto, como en make_entry
+    is_dir = S_ISDIR(stat.st_mode)
+    return FileEntry(name, is_dir, 0 if is_dir else stat.st_size, stat.st_mtime, detect_kind(name, is_dir))
+
+
+def iter_directory(path):
+    """Genera las FileEntry de path según las va leyendo os.scandir."""
+    with os.scandir(path) as it:
+        for dir_entry in it:
+            yield make_entry(dir_entry)
+
+
+def scan_directory(path):
+    """Lista path entero; devuelve [] (y lo avisa) si no se puede leer."""
+    try:
+        return list(iter_directory(path))
+    except OSError as e:
+        print(f"[files] No se pudo listar {path}: {e}")
+        return []
+
+
+class DirectoryLoader:
+    """
+    Lista directorios en un hilo de fondo. load(path) devuelve la generación
+    de la carga; poll() devuelve los mensajes pendientes de la carga actual:
+    ("chunk", [FileEntry, ...]), ("removed", [nombre, ...]), ("done", None)
+    o ("error", texto). "removed" solo aparece al corregir una instantánea
+    de dircache que había cambiado.
+    """
+    def __init__(self):
+        self.generation = 0
+        self.messages = queue.SimpleQueue()  # (generación, tipo, datos)
+        self._cancel = None
+        self._pending = None  # Bloque a medio aplicar (límite por frame)
+
+    def load(self, path):
+        self.cancel()
+        cancel = self._cancel = threading.Event()
+        generation = self.generation
+        threading.Thread(target=self._run, args=(path, generation, cancel), daemon=True).start()
+        return generation
+
+    def cancel(self):
+        """Cancela la carga en curso; lo que ya haya enviado se descartará."""
+        if self._cancel is not None:
+            self._cancel.set()
+        self._cancel = None
+        self._pending = None
+        self.generation += 1
+
+    def _run(self, path, generation, cancel):
+        dir_mtime = dircache.directory_mtime(path)  # Antes de leer: un cambio durante la lectura invalida la copia
+        snapshot = dircache.load(path)
+        cached = None
+        if snapshot is not None:
+            cached = {}
+            rows, start, limit = snapshot[1], 0, FIRST_CHUNK
+            while start < len(rows):
+                chunk = [FileEntry(*row) for row in rows[start:start + limit]]
+                cached.update((entry.name, entry) for entry in chunk)
+                self.messages.put((generation, "chunk", chunk))
+                start, limit = start + limit, CHUNK_SIZE
+            if snapshot[0] == dir_mtime:
+                self.messages.put((generation, "done", None))
+                dircache.touch(path)
+                return
+
+        entries = []
+        try:
+            if cached is None:
+                self._stream(path, generation, cancel, entries)
+            else:
+                # Ya se ve la copia: se lee en silencio y solo se envía la diferencia
+                for entry in iter_directory(path):
+                    if cancel.is_set():
+                        return
+                    entries.append(entry)
+                changed = [e for e in entries if cached.get(e.name) != e]
+                removed = cached.keys() - {e.name for e in entries}
+                if changed:
+                    self.messages.put((generation, "chunk", changed))
+                if removed:
+                    self.messages.put((generation, "removed", list(removed)))
+        except OSError as e:
+            print(f"[files] No se pudo listar {path}: {e}")
+            self.messages.put((generation, "error", str(e)))
+            return
+        if cancel.is_set():
+            return
+        self.messages.put((generation, "done", None))
+        if dir_mtime is not None:
+            # En orden de pantalla: al cargar la copia, el primer bloque ya es el principio de la lista
+            entries.sort(key=sort_key)
+            dircache.store(path, dir_mtime, entries)
+
+    def _stream(self, path, generation, cancel, entries):
+        """Lee path enviando bloques según llegan; deja en entries todo lo leído."""
+        chunk = []
+        limit = FIRST_CHUNK
+        last_send = time.perf_counter()
+        try:
+            for entry in iter_directory(path):
+                if cancel.is_set():
+                    return
+                chunk.append(entry)
+                entries.append(entry)
+                now = time.perf_counter()
+                if len(chunk) >= limit or now - last_send >= CHUNK_INTERVAL:
+                    self.messages.put((generation, "chunk", chunk))
+                    chunk, limit, last_send = [], CHUNK_SIZE, now
+        finally:
+            if chunk and not cancel.is_set():
+                self.messages.put((generation, "chunk", chunk))
+
+    def poll(self, max_entries=POLL_MAX_ENTRIES):
+        """Mensajes de la carga actual, con como mucho max_entries entradas en total."""
+        results = []
+        budget = max_entries
+        while budget > 0:
+            if self._pending is not None:
+                kind, data = "chunk", self._pending
+                self._pending = None
+            else:
+                try:
+                    generation, kind, data = self.messages.get_nowait()
+                except queue.Empty:
+                    break
+                if generation != self.generation:
+                    continue  # Carga cancelada
+            if kind == "chunk":
+                if len(data) > budget:
+                    data, self._pending = data[:budget], data[budget:]
+                budget -= len(data)
+            results.append((kind, data))
+        return results
+
+
+def natural_key(name):
+    """
+    Clave de orden natural: "pista2" va antes que "pista10", sin distinguir
+    mayúsculas. Es una cadena (los números rellenos con ceros) para que
+    ordenar compare cadenas planas y no tuplas.
+    """
+    return _DIGITS.sub(lambda m: m.group().zfill(NATURAL_DIGITS), name.casefold())
+
+
+def sort_key(entry, mode="name"):
+    """Cadena única por entrada: carpetas primero y luego orden natural (o por tipo)."""
+    head = "1" if entry.is_dir else "2"
+    if mode == "type":
+        extension = os.path.splitext(entry.name)[1].casefold()
+        head += KIND_ORDER.get(entry.kind, "4") + extension + "\0"
+    return head + natural_key(entry.name) + "\0" + entry.name
+
+
+def _text_index(names):
+    """
+    Índice de texto de names: todos los nombres en minúsculas separados por
+    "\0", la posición del "\0" que precede a cada uno (y la del final) y la
+    lista de nombres en minúsculas.
+    """
+    folded = "\0".join(names).casefold()
+    parts = folded.split("\0") if names else []
+    starts = [0]
+    starts.extend(accumulate(len(part) + 1 for part in parts))
+    return "\0" + folded + "\0", starts, parts
+
+
+def _matching(index, needle):
+    """Índices (en orden) de los nombres del índice que contienen needle (ya en minúsculas)."""
+    text, starts, parts = index
+    count = text.count(needle)
+    if count * 8 > len(parts):
+        # Coinciden muchos: más barato probar nombre a nombre
+        return [i for i, part in enumerate(parts) if needle in part]
+    result = []
+    position = text.find(needle)
+    while position != -1:
+        i = bisect.bisect_right(starts, position) - 1
+        result.append(i)
+        position = text.find(needle, starts[i + 1])  # Siguiente nombre
+    return result
+
+
+class DirectoryModel:
+    """
+    Listado de una carpeta ordenado una sola vez por carga. all_names es la
+    lista completa en orden de pantalla, names la vista (con set_filter, solo
+    los nombres que contienen el texto) y by_name da la FileEntry de cada
+    nombre.
+
+    Las entradas pueden llegar por bloques (DirectoryLoader): cada bloque se
+    ordena y se mezcla con lo ya ordenado (Timsort lo resuelve como la mezcla
+    de dos tramos), sin reordenar todo desde cero.
+
+    Para buscar se guarda un índice de texto: todos los nombres en minúsculas
+    y en orden de pantalla, separados por "\0" (que no puede aparecer en un
+    nombre de archivo), más la posición donde empieza cada uno. Buscar un
+    prefijo es un solo str.find de "\0" + texto (una subcadena, un find del
+    texto): no se recorre la lista en Python. Filtrar busca todas las
+    apariciones en ese mismo índice; si el texto nuevo contiene al anterior
+    (el usuario sigue tecleando) solo se prueban los nombres de la vista
+    actual, que es cada vez más pequeña.
+    """
+    def __init__(self, sort_mode="name"):
+        self.sort_mode = sort_mode
+        self.clear()
+
+    def __len__(self):
+        return len(self.names)
+
+    def sort_key(self, entry):
+        return sort_key(entry, self.sort_mode)
+
+    # ---------------- CONTENIDO ----------------
+    def clear(self):
+        self.filter_text = ""
+        self.by_name = {}
+        self._sorted = []  # (clave de orden, nombre)
+        self._changed()
+
+    def add_entries(self, entries):
+        """Añade entradas nuevas (o reemplaza las que ya estaban con ese nombre)."""
+        entries = list(entries)
+        if not entries:
+            return
+        replaced = [e.name for e in entries if e.name in self.by_name]
+        if replaced:
+            self.remove_names(replaced)
+        for entry in entries:
+            self.by_name[entry.name] = entry
+        self._sorted.extend(sorted((self.sort_key(e), e.name) for e in entries))
+        self._sorted.sort()
+        self._changed()
+
+    def remove_names(self, names):
+        names = {n for n in names if n in self.by_name}
+        if not names:
+            return
+        for name in names:
+            entry = self.by_name.pop(name)
+            del self._sorted[bisect.bisect_left(self._sorted, (self.sort_key(entry), name))]
+        self._changed()
+
+    def set_sort_mode(self, mode):
+        if mode == self.sort_mode:
+            return
+        self.sort_mode = mode
+        self._sorted = sorted((self.sort_key(e), e.name) for e in self.by_name.values())
+        self._changed()
+
+    def set_filter(self, text):
+        """Deja en names solo los nombres que contienen text ("" quita el filtro)."""
+        text = text.casefold()
+        if text == self.filter_text:
+            return
+        self.filter_text, previous = text, self.filter_text
+        if previous and previous in text:
+            self._apply_filter(self.names, self._parts)  # Se estrecha la vista actual
+        else:
+            index = self._all_names_index()
+            self._apply_filter(self.all_names, index[2], index)
+
+    def _changed(self):
+        self.all_names = list(map(itemgetter(1), self._sorted))
+        self._all_index = None  # Índice de texto de all_names (se construye en la primera búsqueda)
+        if self.filter_text:
+            index = self._all_names_index()
+            self._apply_filter(self.all_names, index[2], index)
+        else:
+            self._apply_filter(self.all_names, None)
+
+    def _apply_filter(self, base, parts, index=None):
+        """names = nombres de base que contienen filter_text (parts: base en minúsculas)."""
+        if self.filter_text:
+            if index is not None:
+                hits = _matching(index, self.filter_text)
+            else:
+                hits = [i for i, part in enumerate(parts) if self.filter_text in part]
+            self.names = [base[i] for i in hits]
+            self._parts = [parts[i] for i in hits]
+        else:
+            self.names = base
+            self._parts = None
+        self._position = None  # nombre -> índice (se calcula al consultarlo)
+        self._index = None  # Índice de texto de names (solo para find)
+
+    def _all_names_index(self):
+        if self._all_index is None:
+            self._all_index = _text_index(self.all_names)
+        return self._all_index
+
+    def _names_index(self):
+        if self._index is None:
+            self._index = self._all_names_index() if self.names is self.all_names else _text_index(self.names)
+        return self._index
+
+    # ---------------- CONSULTAS ----------------
+    def index_of(self, name):
+        """Índice de name en names, o None si no está."""
+        if self._position is None:
+            self._position = {name: i for i, name in enumerate(self.names)}
+        return self._position.get(name)
+
+    def find(self, text, start=0, prefix=True):
+        """
+        Primer índice >= start (dando la vuelta al final) cuyo nombre empieza
+        por text (o lo contiene, con prefix=False), sin distinguir mayúsculas.
+        None si no hay ninguno.
+        """
+        if not self.names or not text:
+            return None
+        haystack, starts, _ = self._names_index()
+        needle = ("\0" if prefix else "") + text.casefold()
+        offset = starts[min(max(start, 0), len(self.names))]
+        position = haystack.find(needle, offset)
+        if position == -1:
+            position = haystack.find(needle, 0, offset + len(needle))
+        if position == -1:
+            return None
+        return bisect.bisect_right(starts, position) - 1
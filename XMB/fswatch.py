@@ -0,0 +1,212 @@
+# fswatch.py
+# Vigila la carpeta abierta en el gestor de archivos y entrega los cambios
+# (creado, borrado, renombrado) para aplicarlos al DirectoryModel sin volver
+# a listar la carpeta entera.
+#
+# En Linux usa inotify a través de ctypes: el descriptor es no bloqueante y
+# poll() lo lee desde el bucle principal, sin hilos. En el resto de sistemas
+# (o si inotify falla) un hilo comprueba el mtime de la carpeta y, solo
+# cuando cambia, la vuelve a listar y compara con el listado anterior.
+#
+# poll() devuelve una lista de cambios:
+#   ("created", FileEntry)     entrada nueva o modificada
+#   ("deleted", nombre)
+#   ("renamed", nombre_viejo, FileEntry)
+#   ("rescan", None)           se perdieron eventos: hay que volver a listar
+import os
+import sys
+import queue
+import struct
+import ctypes
+import ctypes.util
+import threading
+
+from files import entry_from_path, scan_directory
+
+POLL_INTERVAL = 1.0  # Segundos entre comprobaciones del modo sin inotify
+READ_SIZE = 64 * 1024
+
+# Constantes de <sys/inotify.h>. No se usa IN_MODIFY: llega con cada write()
+# de una copia en curso; IN_CLOSE_WRITE avisa una vez, al terminar.
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE | IN_ATTRIB
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None and sys.platform.startswith("linux"):
+        try:
+            _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            _libc.inotify_init1.argtypes = [ctypes.c_int]
+            _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        except (OSError, AttributeError) as e:
+            print(f"[fswatch] inotify no disponible: {e}")
+            _libc = False
+    return _libc or None
+
+
+class InotifyWatch:
+    """Vigilancia de una carpeta con inotify. Se lee con poll() en cada frame."""
+    def __init__(self, path):
+        libc = _load_libc()
+        if libc is None:
+            raise OSError("inotify no disponible")
+        self.path = path
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno), path)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _read_events(self):
+        events = []
+        while self.fd is not None:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((mask, cookie, name))
+        return events
+
+    def poll(self):
+        changes = []
+        moved_from = {}  # cookie -> índice en changes del ("deleted", nombre)
+        for mask, cookie, name in self._read_events():
+            if mask & (IN_Q_OVERFLOW | IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                return [("rescan", None)]
+            if mask & IN_MOVED_FROM:
+                moved_from[cookie] = len(changes)
+                changes.append(("deleted", name))
+            elif mask & IN_DELETE:
+                changes.append(("deleted", name))
+            elif mask & (IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE | IN_ATTRIB):
+                entry = entry_from_path(os.path.join(self.path, name))
+                if entry is None:
+                    continue  # Ya no existe: llegará su IN_DELETE
+                index = moved_from.pop(cookie, None) if mask & IN_MOVED_TO else None
+                if index is not None:
+                    changes[index] = ("renamed", changes[index][1], entry)
+                else:
+                    changes.append(("created", entry))
+        return changes
+
+
+class PollingWatch:
+    """
+    Vigilancia sin inotify: un hilo mira el mtime de la carpeta y, cuando
+    cambia, la lista de nuevo y compara con el listado anterior. El mtime de
+    la carpeta solo cambia con altas, bajas y renombrados (no al editar un
+    archivo); un renombrado se reconoce si es el único cambio y conserva
+    tamaño y fecha.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.messages = queue.SimpleQueue()
+        self._stop = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def close(self):
+        self._stop.set()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _run(self):
+        mtime = self._mtime()
+        snapshot = {entry.name: entry for entry in scan_directory(self.path)}
+        while not self._stop.wait(POLL_INTERVAL):
+            current = self._mtime()
+            if current == mtime:
+                continue
+            mtime = current
+            if current is None:
+                self.messages.put(("rescan", None))
+                return
+            listing = {entry.name: entry for entry in scan_directory(self.path)}
+            deleted = [snapshot[name] for name in snapshot.keys() - listing.keys()]
+            created = [entry for name, entry in listing.items()
+                       if name not in snapshot or snapshot[name][1:4] != entry[1:4]]
+            if len(deleted) == 1 and len(created) == 1 and deleted[0][1:4] == created[0][1:4] and created[0].name not in snapshot:
+                self.messages.put(("renamed", deleted[0].name, created[0]))
+            else:
+                for entry in deleted:
+                    self.messages.put(("deleted", entry.name))
+                for entry in created:
+                    self.messages.put(("created", entry))
+            snapshot = listing
+
+    def poll(self):
+        changes = []
+        while True:
+            try:
+                changes.append(self.messages.get_nowait())
+            except queue.Empty:
+                return changes
+
+
+class DirectoryWatcher:
+    """watch(path) empieza a vigilar (dejando la carpeta anterior); poll() da los cambios."""
+    def __init__(self):
+        self.watch_impl = None
+
+    @property
+    def active(self):
+        return self.watch_impl is not None
+
+    def watch(self, path):
+        self.stop()
+        if not os.path.isdir(path):
+            return  # DirectoryLoader ya avisa del error
+        try:
+            self.watch_impl = InotifyWatch(path)
+        except OSError as e:
+            if _load_libc() is not None:
+                print(f"[fswatch] No se pudo vigilar {path} con inotify ({e}); se comprobará cada {POLL_INTERVAL:g} s")
+            self.watch_impl = PollingWatch(path)
+
+    def stop(self):
+        if self.watch_impl is not None:
+            self.watch_impl.close()
+            self.watch_impl = None
+
+    def poll(self):
+        if self.watch_impl is None:
+            return []
+        try:
+            return self.watch_impl.poll()
+        except OSError as e:
+            print(f"[fswatch] Error leyendo cambios de {self.watch_impl.path}: {e}")
+            self.stop()
+            return []
@@ -6,6 +6,7 @@ Usa get_image("EFA295") desde otros módulos (ej. xmb.py).
 
 import os
 import pygame
+from collections import OrderedDict
 
 # Diccionario: código hex → ruta relativa del archivo de imagen
 IMAGE_CODES = {
@@ -45,6 +46,12 @@ IMAGE_CODES = {
 # Caché de imágenes cargadas para evitar recargas
 _loaded_images = {}
 
+# Caché de iconos escalados: (código o Surface, lado en px) -> Surface, LRU con límite de memoria
+SCALED_CACHE_BYTES = 48 * 1024 * 1024
+SIZE_BUCKET = 2  # Los lados se redondean a múltiplos de esto (menos escalados distintos)
+_scaled_images = OrderedDict()
+_scaled_bytes = 0
+
 def get_image(code, scale=None):
     """
     Devuelve una Surface de pygame para el código dado.
@@ -80,6 +87,52 @@ def get_image(code, scale=None):
             return img
     return img
 
+def size_bucket(size):
+    return max(SIZE_BUCKET, int(round(size / SIZE_BUCKET)) * SIZE_BUCKET)
+
+def get_scaled_image(image, size):
+    """
+    Devuelve image escalada a un cuadrado de lado size (redondeado con size_bucket).
+    - image: código hex (se carga con get_image) o una Surface ya cargada.
+    El resultado se comparte entre llamadas: solo blitearlo, no dibujar encima.
+    """
+    global _scaled_bytes
+    if isinstance(image, str):
+        key_image = image.upper()
+        image = get_image(key_image)
+        if image is None:
+            return None
+    else:
+        key_image = image
+    side = size_bucket(size)
+    key = (key_image, side)
+    scaled = _scaled_images.get(key)
+    if scaled is not None:
+        _scaled_images.move_to_end(key)
+        return scaled
+
+    scaled = pygame.transform.smoothscale(image, (side, side))
+    _scaled_images[key] = scaled
+    _scaled_bytes += side * side * scaled.get_bytesize()
+    while _scaled_bytes > SCALED_CACHE_BYTES and len(_scaled_images) > 1:
+        (_, old_side), old = _scaled_images.popitem(last=False)
+        _scaled_bytes -= old_side * old_side * old.get_bytesize()
+    return scaled
+
+def _forget_scaled(key_image):
+    global _scaled_bytes
+    for key in [k for k in _scaled_images if k[0] is key_image or k[0] == key_image]:
+        old = _scaled_images.pop(key)
+        _scaled_bytes -= key[1] * key[1] * old.get_bytesize()
+
+def warm_scaled_images(images, sizes):
+    """Escala por adelantado cada imagen a cada tamaño (se llama al cambiar el layout)."""
+    for image in images:
+        if image is None:
+            continue
+        for size in sizes:
+            get_scaled_image(image, size)
+
 def register_image(code, path, preload=False):
     """
     Registra dinámicamente un nuevo código -> ruta.
@@ -89,6 +142,7 @@ def register_image(code, path, preload=False):
         return
     code = code.upper()
     IMAGE_CODES[code] = path
+    _forget_scaled(code)
     if preload and os.path.isfile(path):
         try:
             _loaded_images[code] = pygame.image.load(path).convert_alpha()
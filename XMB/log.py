@@ -0,0 +1,158 @@
+# log.py
+# Registro con niveles, límite de frecuencia por punto de llamada y un búfer
+# circular en memoria que vacía un hilo de fondo (el bucle de render nunca
+# escribe en stdout).
+#
+# Los mensajes del camino de cada frame se escriben así:
+#
+#     if __debug__ and FRAME_LOG:
+#         log.debug("main", f"Waves drawn")
+#
+# Con FRAME_LOG desactivado no se formatea nada, y con "python -O" el
+# compilador elimina el bloque entero. XMB_FRAME_LOG=1 baja además el nivel a
+# DEBUG, que es el de esas trazas.
+import os
+import sys
+import time
+import atexit
+import threading
+from collections import deque
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+
+LOG_LEVEL = LEVEL_NAMES.get(os.environ.get("XMB_LOG_LEVEL", "INFO").upper(), INFO)
+FRAME_LOG = os.environ.get("XMB_FRAME_LOG") == "1"  # Trazas por frame/evento (nivel DEBUG)
+LOG_FILE = os.environ.get("XMB_LOG_FILE")  # Además de stdout, si se define
+if FRAME_LOG:
+    LOG_LEVEL = min(LOG_LEVEL, DEBUG)  # Si no, con el nivel INFO por defecto no saldría nada
+
+RING_SIZE = 4096  # Mensajes pendientes; si el hilo se retrasa se descartan los más viejos
+FLUSH_INTERVAL = 0.25
+RATE_LIMIT_BURST = 5  # Mensajes seguidos permitidos por punto de llamada...
+RATE_LIMIT_PER_SEC = 2.0  # ...y ritmo de recarga después
+
+_ring = deque(maxlen=RING_SIZE)
+_history = deque(maxlen=256)  # Últimas líneas escritas (para volcados de depuración)
+_buckets = {}  # (código, línea) -> [fichas, último instante, suprimidos]
+_wake = threading.Event()
+_lock = threading.Lock()
+_thread = None
+_running = False
+
+
+def set_level(level):
+    global LOG_LEVEL
+    if isinstance(level, str):
+        level = LEVEL_NAMES.get(level.upper(), INFO)
+    LOG_LEVEL = level
+
+
+def _allow(key, now):
+    bucket = _buckets.get(key)
+    if bucket is None:
+        _buckets[key] = [RATE_LIMIT_BURST - 1, now, 0]
+        return True, 0
+    tokens = min(RATE_LIMIT_BURST, bucket[0] + (now - bucket[1]) * RATE_LIMIT_PER_SEC)
+    bucket[1] = now
+    if tokens < 1:
+        bucket[0] = tokens
+        bucket[2] += 1
+        return False, 0
+    bucket[0] = tokens - 1
+    suppressed, bucket[2] = bucket[2], 0
+    return True, suppressed
+
+
+def log(level, tag, message, key=None, depth=1):
+    if level < LOG_LEVEL:
+        return
+    now = time.monotonic()
+    if key is None:
+        caller = sys._getframe(depth)
+        key = (caller.f_code, caller.f_lineno)
+    with _lock:
+        allowed, suppressed = _allow(key, now)
+    if not allowed:
+        return
+    line = f"[{tag}] {message}" if tag else message
+    if suppressed:
+        line += f" ({suppressed} mensajes suprimidos)"
+    _ring.append(line)
+    if _thread is None:
+        _start()
+    if level >= ERROR:
+        _wake.set()  # Los errores se escriben cuanto antes
+
+
+def debug(tag, message, key=None):
+    log(DEBUG, tag, message, key, depth=2)
+
+
+def info(tag, message, key=None):
+    log(INFO, tag, message, key, depth=2)
+
+
+def warning(tag, message, key=None):
+    log(WARNING, tag, message, key, depth=2)
+
+
+def error(tag, message, key=None):
+    log(ERROR, tag, message, key, depth=2)
+
+
+def recent(count=50):
+    return list(_history)[-count:]
+
+
+def flush():
+    lines = []
+    while _ring:
+        try:
+            lines.append(_ring.popleft())
+        except IndexError:
+            break
+    if not lines:
+        return
+    _history.extend(lines)
+    text = "\n".join(lines) + "\n"
+    try:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+    except Exception:
+        pass
+    if LOG_FILE:
+        try:
+            with open(LOG_FILE, "a", encoding="utf-8") as f:
+                f.write(text)
+        except Exception:
+            pass
+
+
+def _run():
+    while _running:
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        flush()
+
+
+def _start():
+    global _thread, _running
+    with _lock:
+        if _thread is not None:
+            return
+        _running = True
+        _thread = threading.Thread(target=_run, daemon=True)
+        _thread.start()
+
+
+def shutdown():
+    global _running
+    _running = False
+    _wake.set()
+    if _thread is not None:
+        _thread.join(1.0)
+    flush()
+
+
+atexit.register(shutdown)
@@ -4,12 +4,19 @@ import pygame
 from utils import clamp  # Assuming utils.py has clamp
 from warning_screen import show_warning
 from xmbparte2 import XMBMenu
-from wave import build_waves, change_color, COLOR_PRESETS
+from wave import build_waves, close_waves, set_waves_fps, change_color, COLOR_PRESETS
 from screen import ScreenSettings
 from theme import open_theme_settings  # Import open_theme_settings
+from profiler import FrameProfiler
+from scheduler import FrameScheduler, CLOCK_FPS, MUSIC_FPS
+from compositor import Compositor, present
+import text_cache
+import log
+from log import FRAME_LOG
 
 # ---------------- CONFIG ----------------
-FPS = 500
+FPS = 120  # Tasa completa (entrada o animaciones); en reposo baja según FrameScheduler
+USE_COMPOSITOR = True  # Menú principal por capas con actualización parcial de pantalla
 pygame.init()
 clock = pygame.time.Clock()
 
@@ -17,9 +24,9 @@ clock = pygame.time.Clock()
 try:
     font = pygame.font.Font("FOT-NewRodin Pro DB.otf", 22)
 except Exception as e:
-    print(f"[Error] No se pudo cargar la fuente 'FOT-NewRodin Pro DB.otf': {e}")
+    log.error("Error", f"No se pudo cargar la fuente 'FOT-NewRodin Pro DB.otf': {e}")
     font = pygame.font.SysFont(None, 22)  # Fallback to default system font
-    print("[Info] Usando fuente del sistema por defecto")
+    log.info("Info", "Usando fuente del sistema por defecto")
 
 fps_font = pygame.font.SysFont("Consolas", 18)  # FPS font remains unchanged
 
@@ -29,7 +36,7 @@ try:
     pygame.mixer.init()
     dark_menu_sound = pygame.mixer.Sound("sounds/snd_system_ok.wav")
 except Exception as e:
-    print(f"⚠️ Error cargando sonido del menú oscuro: {e}")
+    log.warning("main", f"Error cargando sonido del menú oscuro: {e}")
 
 # ---------------- MENÚ OSCURO INICIAL ----------------
 def ask_fullscreen(screen, font):
@@ -47,7 +54,7 @@ def ask_fullscreen(screen, font):
         try:
             dark_menu_sound.play()
         except Exception as e:
-            print(f"[Error] No se pudo reproducir el sonido del menú oscuro: {e}")
+            log.error("Error", f"No se pudo reproducir el sonido del menú oscuro: {e}")
 
     waiting = True
     while waiting:
@@ -72,11 +79,11 @@ def ask_fullscreen(screen, font):
         for i, opt in enumerate(options):
             color = (0, 255, 0) if i == selected else (200, 200, 200)
             try:
-                txt = font.render(opt, True, color)
+                txt = text_cache.render(font, opt, True, color)
                 rect = txt.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 + i * 60))
                 screen.blit(txt, rect)
             except Exception as e:
-                print(f"[Error] No se pudo renderizar texto con la fuente: {e}")
+                log.error("Error", f"No se pudo renderizar texto con la fuente: {e}")
 
         pygame.display.flip()
         clock.tick(60)
@@ -88,7 +95,7 @@ def init_screen():
         preview_screen = pygame.display.set_mode((1280, 720), preview_flags)
         pygame.display.set_caption("PS3 Waves Purple Theme")
     except Exception as e:
-        print(f"[Error] No se pudo inicializar la pantalla de vista previa: {e}")
+        log.error("Error", f"No se pudo inicializar la pantalla de vista previa: {e}")
         pygame.quit()
         sys.exit()
 
@@ -102,7 +109,7 @@ def init_screen():
             flags |= pygame.VSYNC
         except AttributeError:
             flags |= 1
-            print("[Info] VSYNC no soportado, usando bandera alternativa")
+            log.info("Info", "VSYNC no soportado, usando bandera alternativa")
     else:
         W, H = 1280, 720
         flags = pygame.SCALED | pygame.DOUBLEBUF
@@ -111,12 +118,17 @@ def init_screen():
         screen = pygame.display.set_mode((W, H), flags)
         pygame.display.set_caption("PS3 Waves Purple Theme")
     except Exception as e:
-        print(f"[Error] No se pudo inicializar la pantalla principal: {e}")
+        log.error("Error", f"No se pudo inicializar la pantalla principal: {e}")
         pygame.quit()
         sys.exit()
 
     return screen, W, H
 
+# ---------------- HUD ----------------
+def draw_hud_layer(surface, fps, fps_color, menu):
+    surface.blit(text_cache.render(fps_font, f"FPS: {fps}", True, fps_color), (10, 10))
+    menu.draw_on(surface, menu.draw_hud)
+
 # ---------------- CALLBACK DE RESOLUCIÓN ----------------
 def on_resolution_change(new_w, new_h):
     global W, H, waves, screen, theme_settings
@@ -125,21 +137,22 @@ def on_resolution_change(new_w, new_h):
         screen = pygame.display.set_surface()
         if screen is None:
             screen = pygame.display.set_mode((W, H))
+        close_waves(waves)
         waves = build_waves(W, H)
         if theme_settings:
             theme_settings.width, theme_settings.height = W, H
             theme_settings.panel_width = int(W * 0.4)
             theme_settings.start_animation()
-        print(f"[on_resolution_change] Resolución cambiada a {W}x{H}")
+        log.info("on_resolution_change", f"Resolución cambiada a {W}x{H}")
     except Exception as e:
-        print(f"[Error] Error en on_resolution_change: {e}")
+        log.error("Error", f"Error en on_resolution_change: {e}")
 
 # ---------------- MAIN ----------------
 if __name__ == "__main__":
     try:
         screen, W, H = init_screen()
     except Exception as e:
-        print(f"[Error] No se pudo inicializar la pantalla: {e}")
+        log.error("Error", f"No se pudo inicializar la pantalla: {e}")
         pygame.quit()
         sys.exit()
 
@@ -147,7 +160,7 @@ if __name__ == "__main__":
     try:
         show_warning(screen, font)
     except Exception as e:
-        print(f"[Error] No se pudo mostrar la pantalla de advertencia: {e}")
+        log.error("Error", f"No se pudo mostrar la pantalla de advertencia: {e}")
 
     # Menú XMB con opción de Themes
     xmb_items = {
@@ -160,7 +173,7 @@ if __name__ == "__main__":
     try:
         xmb_menu = XMBMenu(screen, font, xmb_items)
     except Exception as e:
-        print(f"[Error] No se pudo inicializar XMBMenu: {e}")
+        log.error("Error", f"No se pudo inicializar XMBMenu: {e}")
         pygame.quit()
         sys.exit()
 
@@ -171,13 +184,13 @@ if __name__ == "__main__":
         else:
             xmb_menu.screen_settings = ScreenSettings(screen, font, on_resolution_change=on_resolution_change)
     except Exception as e:
-        print(f"[Error] No se pudo configurar ScreenSettings: {e}")
+        log.error("Error", f"No se pudo configurar ScreenSettings: {e}")
 
     # Crear olas
     try:
         waves = build_waves(W, H)
     except Exception as e:
-        print(f"[Error] No se pudo construir las olas: {e}")
+        log.error("Error", f"No se pudo construir las olas: {e}")
         pygame.quit()
         sys.exit()
 
@@ -188,49 +201,69 @@ if __name__ == "__main__":
     t0 = time.perf_counter()
     running = True
     fps_smooth = 60  # valor inicial
+    target_smooth = 60  # Tasa que pide el scheduler, con el mismo suavizado que fps_smooth
+
+    # Perfilador de frames: F3 muestra el overlay, F4 exporta una traza Chrome
+    profiler = FrameProfiler()
+    # Ritmo de frames según lo que necesita cada pantalla (espera con event.wait)
+    scheduler = FrameScheduler(FPS)
+    # Capas retenidas del menú principal (solo se redibuja lo que cambia)
+    compositor = Compositor(screen)
 
     while running:
-        dt = clock.tick(FPS) / 1000.0
+        profiler.begin_frame()
+        with profiler.stage("tick"):
+            dt, events = scheduler.next_frame()
 
-        for event in pygame.event.get():
+        events_start = time.perf_counter()
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle_overlay()
+                compositor.invalidate()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                profiler.export_trace()
             else:
-                print(f"[main] Processing event: {event.type}")
+                if __debug__ and FRAME_LOG:
+                    log.debug("main", f"Processing event: {event.type}")
                 if theme_settings is not None:
                     # Handle ThemeSettings events
                     try:
                         result = theme_settings.handle_event(event)
                         if result == "exit":
-                            print(f"[main] ThemeSettings closed, returning to XMB")
+                            log.info("main", f"ThemeSettings closed, returning to XMB")
                             theme_settings = None
                             xmb_menu.state = "menu"  # Set to "menu" to ensure XMB rendering
                             xmb_menu.update(dt)  # Update XMB state
-                            print(f"[main] XMB state set to 'menu'")
+                            log.info("main", f"XMB state set to 'menu'")
                         else:
                             # Update gradients after every theme selection
                             for wave in waves:
                                 wave.update_gradient()
-                            print(f"[main] Gradients updated after theme selection")
+                            log.info("main", f"Gradients updated after theme selection")
                     except Exception as e:
-                        print(f"[Error] Error procesando eventos de ThemeSettings: {e}")
+                        log.error("Error", f"Error procesando eventos de ThemeSettings: {e}")
                 else:
                     # Pass events to XMBMenu
                     try:
                         xmb_menu.handle_event(event)
-                        print(f"[main] XMB state: {xmb_menu.state}")
+                        if __debug__ and FRAME_LOG:
+                            log.debug("main", f"XMB state: {xmb_menu.state}")
                         # Check if Themes is selected
                         if xmb_menu.state == "show_theme_settings":
                             theme_settings = open_theme_settings(screen, font)
-                            print(f"[main] Opened ThemeSettings")
+                            log.info("main", f"Opened ThemeSettings")
                     except Exception as e:
-                        print(f"[Error] Error procesando eventos de XMBMenu: {e}")
+                        log.error("Error", f"Error procesando eventos de XMBMenu: {e}")
+        profiler.record("events", events_start, time.perf_counter())
 
         # Detectar resize externo
         try:
             current_size = screen.get_size()
             if (current_size[0] != W) or (current_size[1] != H):
                 W, H = current_size
+                close_waves(waves)
                 waves = build_waves(W, H)
                 if xmb_menu.screen_settings:
                     xmb_menu.screen_settings.W, xmb_menu.screen_settings.H = W, H
@@ -239,61 +272,129 @@ if __name__ == "__main__":
                     theme_settings.panel_width = int(W * 0.4)
                     theme_settings.start_animation()
                 xmb_menu.update_layout()  # Update XMB layout on resize
-                print(f"[main] Cambio de tamaño -> {W}x{H}")
+                log.info("main", f"Cambio de tamaño -> {W}x{H}")
         except Exception as e:
-            print(f"[Error] Error detectando cambio de tamaño: {e}")
+            log.error("Error", f"Error detectando cambio de tamaño: {e}")
 
         t = time.perf_counter() - t0
 
+        # Menú principal por capas: las olas van al fondo del compositor
+        use_layers = USE_COMPOSITOR and theme_settings is None and xmb_menu.can_use_layers()
+        if use_layers:
+            compositor.begin_frame(screen)
+
         # Dibujar olas (incluye el gradiente de fondo)
         try:
             for w in waves:
-                w.update()
-                w.draw(screen, W, H, t)
-                print(f"[main] Waves drawn")
+                with profiler.stage("wave_update"):
+                    w.update()
+                with profiler.stage("wave_draw"):
+                    if use_layers:
+                        compositor.draw_background(w, W, H, t)
+                    else:
+                        w.draw(screen, W, H, t)
+                if __debug__ and FRAME_LOG:
+                    log.debug("main", "Waves drawn")
         except Exception as e:
-            print(f"[Error] Error dibujando olas: {e}")
+            log.error("Error", f"Error dibujando olas: {e}")
 
         # Dibujar menú o configuración
         try:
             if theme_settings is not None:
-                theme_settings.update(dt)
-                theme_settings.draw(W, H, t)
-                print(f"[main] ThemeSettings drawn")
+                with profiler.stage("menu_update"):
+                    theme_settings.update(dt)
+                with profiler.stage("menu_draw"):
+                    theme_settings.draw(W, H, t)
+                if __debug__ and FRAME_LOG:
+                    log.debug("main", "ThemeSettings drawn")
             elif xmb_menu.state == "show_screen_settings" and xmb_menu.screen_settings:
-                xmb_menu.screen_settings.update(dt)
-                xmb_menu.screen_settings.draw(waves, W, H, t)
-                print(f"[main] ScreenSettings drawn")
+                with profiler.stage("menu_update"):
+                    xmb_menu.screen_settings.update(dt)
+                with profiler.stage("menu_draw"):
+                    xmb_menu.screen_settings.draw(waves, W, H, t)
+                if __debug__ and FRAME_LOG:
+                    log.debug("main", "ScreenSettings drawn")
             else:
-                xmb_menu.update(dt)
-                xmb_menu.draw()
-                print(f"[main] XMB menu drawn, state: {xmb_menu.state}")
+                with profiler.stage("menu_update"):
+                    xmb_menu.update(dt)
+                with profiler.stage("menu_draw"):
+                    if use_layers and not xmb_menu.can_use_layers():
+                        # update() cambió de pantalla: dibujo directo este frame
+                        screen.blit(compositor.background, (0, 0))
+                        use_layers = False
+                    if use_layers:
+                        xmb_menu.draw_menu_layers(compositor)
+                    else:
+                        xmb_menu.draw()
+                if __debug__ and FRAME_LOG:
+                    log.debug("main", f"XMB menu drawn, state: {xmb_menu.state}")
         except Exception as e:
-            print(f"[Error] Error dibujando menú/configuración: {e}")
+            log.error("Error", f"Error dibujando menú/configuración: {e}")
+
+        # Declarar lo que necesita la pantalla actual para el próximo frame
+        if theme_settings is not None:
+            scheduler.set_need(animating=theme_settings.is_animating)
+        elif xmb_menu.state == "show_screen_settings" and xmb_menu.screen_settings:
+            scheduler.set_need(animating=xmb_menu.screen_settings.offset_x != xmb_menu.screen_settings.target_offset_x)
+        elif xmb_menu.state == "music_player" and xmb_menu.music_player:
+            player = xmb_menu.music_player
+            scheduler.set_need(fps=min(MUSIC_FPS, player.sample_rate / player.window_size))  # Un frame por bloque de audio
+        elif xmb_menu.state == "show_clock":
+            scheduler.set_need(fps=CLOCK_FPS)
+        else:
+            scheduler.set_need(animating=xmb_menu.is_animating())
+        set_waves_fps(waves, scheduler.target_fps())
 
         # FPS suavizado
+        fps_start = time.perf_counter()
         try:
-            raw_fps = clock.get_fps()
+            raw_fps = scheduler.get_fps()
             fps_smooth = 0.9 * fps_smooth + 0.1 * raw_fps
             fps = int(fps_smooth)
 
-            if fps >= 58:
+            # El color compara con la tasa objetivo (en reposo son IDLE_FPS, no 60)
+            target_smooth = 0.9 * target_smooth + 0.1 * scheduler.target_fps()
+            if fps >= target_smooth * 0.95:
                 fps_color = (0, 255, 0)
-            elif fps >= 40:
+            elif fps >= target_smooth * 2 / 3:
                 fps_color = (255, 200, 0)
             else:
                 fps_color = (255, 0, 0)
 
-            fps_text = fps_font.render(f"FPS: {fps}", True, fps_color)
-            screen.blit(fps_text, (10, 10))
+            if use_layers:
+                compositor.layer("hud", (fps, fps_color, xmb_menu.active_user, W, H),
+                                 lambda surface: draw_hud_layer(surface, fps, fps_color, xmb_menu))
+            else:
+                fps_text = text_cache.render(fps_font, f"FPS: {fps}", True, fps_color)
+                screen.blit(fps_text, (10, 10))
         except Exception as e:
-            print(f"[Error] Error renderizando FPS: {e}")
+            log.error("Error", f"Error renderizando FPS: {e}")
+        profiler.record("fps_text", fps_start, time.perf_counter())
 
-        try:
-            pygame.display.flip()
-            print(f"[main] Frame rendered, FPS: {fps}")
-        except Exception as e:
-            print(f"[Error] Error actualizando pantalla: {e}")
+        if use_layers:
+            with profiler.stage("compose"):
+                dirty_rects = compositor.compose(screen)
+        else:
+            compositor.invalidate()  # Al volver al menú se recompone entero
+
+        with profiler.stage("overlay"):
+            profiler.draw_overlay(screen)
+
+        with profiler.stage("flip"):
+            try:
+                if use_layers and not profiler.overlay_visible:
+                    present(dirty_rects)
+                else:
+                    pygame.display.flip()
+                if __debug__ and FRAME_LOG:
+                    log.debug("main", f"Frame rendered, FPS: {fps}")
+            except Exception as e:
+                log.error("Error", f"Error actualizando pantalla: {e}")
+        text_hits, text_misses = text_cache.take_stats()
+        profiler.count("text_cache_hits", text_hits)
+        profiler.count("text_cache_misses", text_misses)
+        profiler.end_frame()
 
+    close_waves(waves)
     pygame.quit()
     sys.exit()
\ No newline at end of file
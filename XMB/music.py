@@ -2,10 +2,11 @@ import pygame
 import sys
 import os
 import numpy as np
-from pydub import AudioSegment
 from mutagen.id3 import ID3, TPE1, TIT2, TALB
 import io
 from PIL import Image
+import text_cache
+from audio_stream import AudioStream
 
 # Dictionary of images
 IMAGE_CODES = {
@@ -74,24 +75,20 @@ class MusicVisualizer:
 
         self.track_index, self.total_tracks = self.get_track_info(song_path)
 
+        # PCM decoded in the background, only around the playback position (see audio_stream.py)
+        self.stream = AudioStream(song_path)
+        self.sample_rate = self.stream.sample_rate
+
         try:
-            song = AudioSegment.from_file(song_path)
+            if not pygame.mixer.get_init():
+                pygame.mixer.init(frequency=self.sample_rate)
+            pygame.mixer.music.load(song_path)
+            pygame.mixer.music.play()
         except Exception as e:
             print(f"Could not load song: {e}")
+            self.stream.close()
             self.running = False
             return
-
-        samples = np.array(song.get_array_of_samples())
-        if song.channels == 2:
-            samples = samples.reshape((-1, 2)).mean(axis=1)  # Mix stereo to mono: (L+R)/2
-        self.sample_rate = song.frame_rate
-        self.samples = samples.astype(np.float32)
-        self.samples /= np.max(np.abs(self.samples))  # Normalize to [-1.0, 1.0]
-
-        if not pygame.mixer.get_init():
-            pygame.mixer.init(frequency=self.sample_rate)
-        pygame.mixer.music.load(song_path)
-        pygame.mixer.music.play()
         self.running = True
 
         # Wave visualization settings (PSP style)
@@ -186,10 +183,14 @@ class MusicVisualizer:
             self.song_title = "Unknown"
             self.album_name = "Unknown"
 
+    def stop(self):
+        self.running = False
+        pygame.mixer.music.stop()
+        self.stream.close()
+
     def handle_event(self, event):
         if event.type == pygame.QUIT:
-            self.running = False
-            pygame.mixer.music.stop()
+            self.stop()
         elif event.type == pygame.KEYDOWN:
             if event.key == pygame.K_SPACE:
                 if self.paused:
@@ -199,8 +200,7 @@ class MusicVisualizer:
                     pygame.mixer.music.pause()
                     self.paused = True
             elif event.key == pygame.K_ESCAPE:
-                self.running = False
-                pygame.mixer.music.stop()
+                self.stop()
             elif event.key == pygame.K_TAB:
                 # Cycle through modes: wave -> dots -> bars -> futiger_aero -> wave
                 modes = ["wave", "dots", "bars", "futiger_aero"]
@@ -223,16 +223,15 @@ class MusicVisualizer:
     def update(self, dt):
         if not self.paused:
             self.position += int(self.sample_rate * dt)
-            if self.position >= len(self.samples):
-                self.position = len(self.samples)
+            if self.stream.length is not None and self.position >= self.stream.length:
+                self.position = self.stream.length
+            self.stream.set_position(self.position)
 
     def get_wave_samples(self):
         """Extract PCM samples for the wave visualization."""
-        start = self.position
-        end = start + self.window_size
-        if end >= len(self.samples):
+        samples = self.stream.read(self.position, self.window_size)
+        if samples is None:
             return np.zeros(self.wave_points)
-        samples = self.samples[start:end]
         if len(samples) > 0:
             x = np.linspace(0, len(samples) - 1, self.wave_points)
             samples = np.interp(x, np.arange(len(samples)), samples)
@@ -242,11 +241,10 @@ class MusicVisualizer:
 
     def get_levels(self):
         """Calculate frequency levels for dots, bars, and futiger_aero visualizations."""
-        start = self.position
-        end = start + self.window_size
-        if end >= len(self.samples):
+        samples = self.stream.read(self.position, self.window_size)
+        if samples is None:
             return [0] * max(self.cols, self.bars_num, self.aero_points)
-        window = self.samples[start:end] * np.hanning(self.window_size)
+        window = samples * np.hanning(self.window_size)
         spectrum = np.abs(np.fft.rfft(window))
         freqs = np.fft.rfftfreq(self.window_size, 1/self.sample_rate)
 
@@ -382,11 +380,11 @@ class MusicVisualizer:
         if self.music_icon:
             self.screen.blit(self.music_icon, (10, (self.bar_height - 64) // 2))
 
-        text_surface = self.bar_font.render(self.author, True, (255, 255, 255))
+        text_surface = text_cache.render(self.bar_font, self.author, True, (255, 255, 255))
         self.screen.blit(text_surface, (84, (self.bar_height - text_surface.get_height()) // 2))
 
         counter_text = f"({self.track_index}/{self.total_tracks})"
-        counter_surface = self.bar_font.render(counter_text, True, (255, 255, 255))
+        counter_surface = text_cache.render(self.bar_font, counter_text, True, (255, 255, 255))
         self.screen.blit(counter_surface, (self.screen.get_width() - 10 - counter_surface.get_width(),
                                          (self.bar_height - counter_surface.get_height()) // 2))
 
@@ -396,9 +394,9 @@ class MusicVisualizer:
             self.screen.blit(self.album_art, (album_x, album_y))
             line_y = album_y + 60
             pygame.draw.line(self.screen, (255, 255, 255), (album_x + 120, line_y), (self.screen.get_width() - 20, line_y), 2)
-            title_surface = self.bar_font.render(self.song_title, True, (255, 255, 255))
+            title_surface = text_cache.render(self.bar_font, self.song_title, True, (255, 255, 255))
             self.screen.blit(title_surface, (album_x + 130, line_y - title_surface.get_height() - 5))
-            album_surface = self.font.render(self.album_name, True, (255, 255, 255))
+            album_surface = text_cache.render(self.font, self.album_name, True, (255, 255, 255))
             self.screen.blit(album_surface, (album_x + 130, line_y + 5))
 
             file_extension = os.path.splitext(self.song_path)[1].lower()
@@ -436,17 +434,17 @@ class MusicVisualizer:
         line_y = self.screen.get_height() - 50
         pygame.draw.line(self.screen, (255, 255, 255), (line_start_x, line_y), (line_end_x, line_y), 10)
 
-        if len(self.samples) > 0:
-            progress = self.position / len(self.samples)
+        if self.stream.length:
+            progress = self.position / self.stream.length
             progress_end_x = line_start_x + (line_end_x - line_start_x) * progress
             pygame.draw.line(self.screen, (0, 0, 255), (line_start_x, line_y), (progress_end_x, line_y), 10)
 
-            total_seconds = len(self.samples) / self.sample_rate
+            total_seconds = self.stream.length / self.sample_rate
             current_seconds = min(self.position / self.sample_rate, total_seconds)
             current_time = self.format_time(current_seconds)
             total_time = self.format_time(total_seconds)
-            current_time_surface = self.time_font.render(current_time, True, (0, 0, 255))
-            total_time_surface = self.time_font.render(f"/{total_time}", True, (255, 255, 255))
+            current_time_surface = text_cache.render(self.time_font, current_time, True, (0, 0, 255))
+            total_time_surface = text_cache.render(self.time_font, f"/{total_time}", True, (255, 255, 255))
             total_text_width = current_time_surface.get_width() + total_time_surface.get_width()
 
             text_x = line_end_x - total_text_width - 10
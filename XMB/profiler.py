@@ -0,0 +1,182 @@
+# profiler.py
+# Perfilador de frames: mide cada etapa del bucle principal, dibuja un
+# overlay con barras apiladas (F3 en main.py) y exporta la historia en
+# formato Chrome trace (F4), que se abre en chrome://tracing o Perfetto.
+import os
+import json
+import time
+from collections import deque
+import pygame
+
+# Etapas conocidas y su color en el overlay (las desconocidas usan OTHER_COLOR)
+STAGE_COLORS = {
+    "tick": (90, 90, 90),
+    "events": (255, 200, 0),
+    "wave_update": (0, 160, 255),
+    "wave_draw": (0, 90, 220),
+    "menu_update": (0, 220, 120),
+    "menu_draw": (0, 150, 60),
+    "fps_text": (220, 0, 220),
+    "compose": (0, 200, 200),
+    "flip": (255, 80, 80),
+    "overlay": (120, 120, 160),
+}
+OTHER_COLOR = (200, 200, 200)
+
+HISTORY_FRAMES = 600  # Frames guardados para el overlay y la exportación
+FRAME_BUDGET_MS = 1000 / 60
+OVERLAY_FRAMES = 160  # Barras visibles en el overlay
+OVERLAY_MAX_MS = 40.0  # Altura completa de la gráfica
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class FrameProfiler:
+    def __init__(self, history=HISTORY_FRAMES):
+        self.frames = deque(maxlen=history)  # (inicio, fin, [(etapa, inicio, fin), ...], contadores)
+        self.current = None
+        self.frame_start = 0.0
+        self.counters = {}
+        self.origin = time.perf_counter()
+        self.overlay_visible = False
+        self.font = None
+        self._legend = None
+        self._legend_frame = 0
+
+    # ---------------- MEDICIÓN ----------------
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+        self.current = []
+        self.counters = {}
+
+    def stage(self, name):
+        """Uso: with profiler.stage("wave_draw"): ..."""
+        return _Stage(self, name)
+
+    def record(self, name, start, end):
+        if self.current is not None:
+            self.current.append((name, start, end))
+
+    def count(self, name, value):
+        """Contador por frame (aparece como evento "C" en la traza)."""
+        self.counters[name] = value
+
+    def end_frame(self):
+        if self.current is None:
+            return
+        self.frames.append((self.frame_start, time.perf_counter(), self.current, self.counters))
+        self.current = None
+
+    def stage_totals(self, frame):
+        totals = {}
+        for name, start, end in frame[2]:
+            totals[name] = totals.get(name, 0.0) + (end - start) * 1000
+        return totals
+
+    def averages(self, frames=120):
+        recent = list(self.frames)[-frames:]
+        sums = {}
+        for frame in recent:
+            for name, ms in self.stage_totals(frame).items():
+                sums[name] = sums.get(name, 0.0) + ms
+        count = max(1, len(recent))
+        return {name: ms / count for name, ms in sums.items()}
+
+    # ---------------- OVERLAY ----------------
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+        print(f"[FrameProfiler] Overlay {'activado' if self.overlay_visible else 'desactivado'}")
+
+    def draw_overlay(self, screen):
+        if not self.overlay_visible or not self.frames:
+            return
+        if self.font is None:
+            self.font = pygame.font.SysFont("Consolas", 14)
+        bar_w = 2
+        graph_w = OVERLAY_FRAMES * bar_w
+        graph_h = 120
+        legend_h = 16 * ((len(STAGE_COLORS) + 1) // 2) + 22
+        panel = pygame.Surface((graph_w + 16, graph_h + legend_h + 16), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        scale = graph_h / OVERLAY_MAX_MS
+
+        # Barras apiladas, una por frame
+        frames = list(self.frames)[-OVERLAY_FRAMES:]
+        x = 8 + graph_w - len(frames) * bar_w
+        for frame in frames:
+            y = 8 + graph_h
+            for name, ms in self.stage_totals(frame).items():
+                h = ms * scale
+                if h >= 0.5:
+                    top = max(8, y - h)
+                    pygame.draw.rect(panel, STAGE_COLORS.get(name, OTHER_COLOR), (x, int(top), bar_w, max(1, int(y - top))))
+                    y = top
+            x += bar_w
+
+        # Línea del presupuesto de 60 FPS
+        budget_y = 8 + graph_h - int(FRAME_BUDGET_MS * scale)
+        pygame.draw.line(panel, (255, 255, 255), (8, budget_y), (8 + graph_w, budget_y), 1)
+
+        # Leyenda con la media por etapa (se regenera cada 15 frames)
+        self._legend_frame += 1
+        if self._legend is None or self._legend_frame >= 15:
+            self._legend_frame = 0
+            self._legend = self._render_legend(graph_w, legend_h)
+        panel.blit(self._legend, (8, graph_h + 12))
+        screen.blit(panel, (screen.get_width() - panel.get_width() - 10, 10))
+
+    def _render_legend(self, width, height):
+        legend = pygame.Surface((width, height), pygame.SRCALPHA)
+        averages = self.averages()
+        total = sum(averages.values())
+        text = self.font.render(f"frame {total:5.2f} ms  ({1000 / total if total else 0:4.0f} fps)", True, (255, 255, 255))
+        legend.blit(text, (0, 0))
+        for i, (name, color) in enumerate(STAGE_COLORS.items()):
+            col, row = i % 2, i // 2
+            x, y = col * (width // 2), 20 + row * 16
+            pygame.draw.rect(legend, color, (x, y + 3, 10, 10))
+            text = self.font.render(f"{name} {averages.get(name, 0.0):5.2f}", True, (230, 230, 230))
+            legend.blit(text, (x + 14, y))
+        return legend
+
+    # ---------------- EXPORTACIÓN ----------------
+    def export_trace(self, path=None):
+        """Escribe la historia en formato Chrome trace (JSON) y devuelve la ruta."""
+        if path is None:
+            path = f"frame_trace_{time.strftime('%Y%m%d_%H%M%S')}.json"
+
+        def us(t):
+            return round((t - self.origin) * 1e6, 1)
+
+        events = []
+        for index, (start, end, stages, counters) in enumerate(self.frames):
+            events.append({"name": "frame", "cat": "frame", "ph": "X", "pid": 0, "tid": 0,
+                           "ts": us(start), "dur": round((end - start) * 1e6, 1), "args": {"index": index}})
+            for name, s, e in stages:
+                events.append({"name": name, "cat": "stage", "ph": "X", "pid": 0, "tid": 0,
+                               "ts": us(s), "dur": round((e - s) * 1e6, 1)})
+            for name, value in counters.items():
+                events.append({"name": name, "ph": "C", "pid": 0, "ts": us(start), "args": {name: value}})
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+            print(f"[FrameProfiler] Traza exportada: {os.path.abspath(path)} ({len(self.frames)} frames)")
+        except Exception as e:
+            print(f"[Error] No se pudo exportar la traza: {e}")
+            return None
+        return path
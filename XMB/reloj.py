@@ -3,6 +3,7 @@ import time
 import math
 from pygame import gfxdraw
 import random
+import text_cache
 
 # --- Colores ---
 COLOR_BG = (10, 10, 30)
@@ -24,6 +25,14 @@ TRAIL_FADE_STEP = 40  # cuánto pierde de brillo cada paso atrás en la estela
 # Inicializar lista de intensidades (0 = invisible, 255 = visible)
 second_marks_alpha = [0 for _ in range(MARK_COUNT)]
 
+_number_font = None  # Se crea una vez (antes era una fuente nueva por frame)
+
+def get_number_font():
+    global _number_font
+    if _number_font is None:
+        _number_font = pygame.font.Font(None,100)
+    return _number_font
+
 def draw_fondo(screen):
     """Fondo dinámico tipo bokeh/lupa"""
     W, H = screen.get_size()
@@ -109,11 +118,11 @@ def draw_reloj(screen):
         clock_surface.blit(mark_surf, rect)
 
     # --- Números ---
-    font = pygame.font.Font(None,100)
+    font = get_number_font()
     numbers = {0:"12",3:"3",6:"6",9:"9"}
     for i,num in numbers.items():
         angle = math.radians(i*30-90)
-        text = font.render(num, True, COLOR_NUM)
+        text = text_cache.render(font, num, True, COLOR_NUM)
         rect = text.get_rect()
         radius_num = clock_radius - 40
         rect.center = (int(center[0]+radius_num*math.cos(angle)), int(center[1]+radius_num*math.sin(angle)))
@@ -0,0 +1,71 @@
+# scheduler.py
+# Ritmo de frames según lo que necesita la pantalla actual, en lugar de
+# redibujar todo a FPS fijo. Con entrada reciente o animaciones en curso se
+# va a la tasa completa; en reposo se baja a la tasa de la pantalla. La espera
+# se hace con pygame.event.wait(timeout), así que cualquier tecla o clic
+# despierta el bucle al instante y vuelve a la tasa completa.
+import time
+import pygame
+
+IDLE_FPS = 30  # Menú quieto: solo se mueven las olas de fondo
+CLOCK_FPS = 30  # Reloj: aguja de segundos continua + desvanecido de marcas
+MUSIC_FPS = 60  # Tope para el visualizador (se limita además al ritmo de bloques de audio)
+ACTIVE_HOLD = 1.0  # Segundos a tasa completa tras la última entrada
+
+INPUT_EVENTS = {
+    pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP,
+    pygame.MOUSEMOTION, pygame.MOUSEWHEEL, pygame.TEXTINPUT,
+    pygame.JOYBUTTONDOWN, pygame.JOYAXISMOTION, pygame.JOYHATMOTION,
+    pygame.VIDEORESIZE, pygame.WINDOWFOCUSGAINED,
+}
+
+
+class FrameScheduler:
+    def __init__(self, active_fps, idle_fps=IDLE_FPS):
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.need_fps = idle_fps
+        self.last_input = time.perf_counter()
+        self.last_frame = time.perf_counter()
+        self.clock = pygame.time.Clock()  # Solo para get_fps()
+
+    def set_need(self, animating=False, fps=None):
+        """
+        Declara lo que necesita la pantalla actual para el próximo frame:
+        animating=True fuerza la tasa completa (lerps sin asentar); fps fija
+        la tasa de reposo de la pantalla (reloj, visualizador...).
+        """
+        if animating:
+            self.need_fps = self.active_fps
+        else:
+            self.need_fps = min(self.active_fps, fps or self.idle_fps)
+
+    def target_fps(self):
+        if time.perf_counter() - self.last_input < ACTIVE_HOLD:
+            return self.active_fps
+        return self.need_fps
+
+    def next_frame(self):
+        """Espera hasta el próximo frame (o hasta una entrada) y devuelve (dt, eventos)."""
+        deadline = self.last_frame + 1.0 / self.target_fps()
+        events = []
+        remaining_ms = int((deadline - time.perf_counter()) * 1000)
+        if remaining_ms > 0:
+            event = pygame.event.wait(remaining_ms)
+            if event.type != pygame.NOEVENT:
+                events.append(event)
+        events.extend(pygame.event.get())
+
+        now = time.perf_counter()
+        if any(event.type in INPUT_EVENTS for event in events):
+            self.last_input = now
+        dt = now - self.last_frame
+        self.last_frame = now
+        self.clock.tick()
+        return dt, events
+
+    def get_fps(self):
+        return self.clock.get_fps()
+
+    def is_idle(self):
+        return self.target_fps() < self.active_fps
@@ -1,6 +1,8 @@
 import pygame
 from images import get_image
 from utils import make_gradient
+import text_cache
+from wave import RENDER_SCALES, get_render_scale, set_render_scale
 
 
 def gaussian_blur(surface, scale_factor=0.18, passes=3):
@@ -21,7 +23,7 @@ class ScreenSettings:
         self.screen = screen
         self.base_font = font
         self.on_resolution_change = on_resolution_change
-        self.items_main = ["Automáticos", "Personalizados"]
+        self.items_main = ["Automáticos", "Personalizados", "Escala de render"]
 
         modes = pygame.display.list_modes()
         if modes == -1 or not modes:
@@ -52,6 +54,7 @@ class ScreenSettings:
         self.blur_passes = 3
 
     def update_font(self):
+        text_cache.forget_font(getattr(self, "font", None))
         font_size = int(self.H * 0.04)
         if isinstance(self.base_font, str) or self.base_font is None:
             self.font = pygame.font.SysFont(self.base_font or 'arial', font_size)
@@ -77,6 +80,16 @@ class ScreenSettings:
                  (int(arrow_width * 0.75), int(arrow_height * 0.9))]
             )
 
+    def main_label(self, idx):
+        item = self.items_main[idx]
+        if idx == 2:
+            return f"{item}: {int(get_render_scale() * 100)}%"
+        return item
+
+    def cycle_render_scale(self, step):
+        idx = RENDER_SCALES.index(get_render_scale()) if get_render_scale() in RENDER_SCALES else len(RENDER_SCALES) - 1
+        set_render_scale(RENDER_SCALES[(idx + step) % len(RENDER_SCALES)])
+
     def start_animation(self, new_target):
         self.start_offset_x = self.offset_x
         self.target_offset_x = new_target
@@ -91,8 +104,11 @@ class ScreenSettings:
                         self.current_res_col = 0
                         self.current_res_idx = 0
                         self.start_animation(-self.W)
+                    elif self.current_index_main == 2:
+                        self.cycle_render_scale(1)
                 elif event.key == pygame.K_LEFT:
-                    pass
+                    if self.current_index_main == 2:
+                        self.cycle_render_scale(-1)
                 elif event.key == pygame.K_ESCAPE:
                     return "exit"
                 elif event.key == pygame.K_DOWN:
@@ -122,6 +138,8 @@ class ScreenSettings:
                         self.current_res_col = 0
                         self.current_res_idx = 0
                         self.start_animation(-self.W)
+                    elif self.current_index_main == 2:
+                        self.cycle_render_scale(1)
 
             elif self.page == 1:
                 current_list = self.res_left if self.current_res_col == 0 else self.res_right
@@ -210,18 +228,19 @@ class ScreenSettings:
         pygame.draw.line(self.screen, color, (0, margin_y), (self.W, margin_y), 2)
         pygame.draw.line(self.screen, color, (0, self.H - margin_y), (self.W, self.H - margin_y), 2)
 
-        title_surf = self.font.render("Ajustes de salida de video", True, (255, 255, 255))
+        title_surf = text_cache.render(self.font, "Ajustes de salida de video", True, (255, 255, 255))
         title_rect = title_surf.get_rect(topleft=(int(self.W * 0.05), int(self.H * 0.05)))
         self.screen.blit(title_surf, title_rect)
 
         x_base_main = self.W // 2 + int(self.offset_x)
         spacing_vertical = int(self.H * 0.005)
-        total_height_main = sum(self.font.size(i)[1] for i in self.items_main) + spacing_vertical * (len(self.items_main) - 1)
+        labels = [self.main_label(idx) for idx in range(len(self.items_main))]
+        total_height_main = sum(text_cache.size(self.font, i)[1] for i in labels) + spacing_vertical * (len(labels) - 1)
         start_y = (self.H - total_height_main) // 2
         current_y = start_y
-        for idx, item in enumerate(self.items_main):
+        for idx, item in enumerate(labels):
             color = (255, 255, 0) if (self.page == 0 and idx == self.current_index_main) else (255, 255, 255)
-            txt = self.font.render(item, True, color)
+            txt = text_cache.render(self.font, item, True, color)
             rect = txt.get_rect(center=(x_base_main, current_y + txt.get_height() // 2))
             self.screen.blit(txt, rect)
 
@@ -237,24 +256,24 @@ class ScreenSettings:
         x_base_res = int(self.offset_x) + self.W
         spacing = int(self.H * 0.02)
 
-        total_height_left = sum(self.font.size(res)[1] for res in self.res_left) + spacing * (len(self.res_left) - 1)
+        total_height_left = sum(text_cache.size(self.font, res)[1] for res in self.res_left) + spacing * (len(self.res_left) - 1)
         start_y_left = (self.H - total_height_left) // 2
         y = start_y_left
         x_left = x_base_res + int(self.W * 0.33)
         for idx, res in enumerate(self.res_left):
             color = (255, 255, 0) if (self.page == 1 and self.current_res_col == 0 and idx == self.current_res_idx) else (255, 255, 255)
-            txt = self.font.render(res, True, color)
+            txt = text_cache.render(self.font, res, True, color)
             rect = txt.get_rect(center=(x_left, y + txt.get_height() // 2))
             self.screen.blit(txt, rect)
             y += txt.get_height() + spacing
 
-        total_height_right = sum(self.font.size(res)[1] for res in self.res_right) + spacing * (len(self.res_right) - 1)
+        total_height_right = sum(text_cache.size(self.font, res)[1] for res in self.res_right) + spacing * (len(self.res_right) - 1)
         start_y_right = (self.H - total_height_right) // 2
         y = start_y_right
         x_right = x_base_res + int(self.W * 0.66)
         for idx, res in enumerate(self.res_right):
             color = (255, 255, 0) if (self.page == 1 and self.current_res_col == 1 and idx == self.current_res_idx) else (255, 255, 255)
-            txt = self.font.render(res, True, color)
+            txt = text_cache.render(self.font, res, True, color)
             rect = txt.get_rect(center=(x_right, y + txt.get_height() // 2))
             self.screen.blit(txt, rect)
             y += txt.get_height() + spacing
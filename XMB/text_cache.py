@@ -0,0 +1,87 @@
+# text_cache.py
+# Caché compartida de texto renderizado. font.render se llamaba cada frame
+# para las mismas cadenas en todas las pantallas; aquí se guarda la Surface
+# por (fuente, texto, color, antialias, fondo) en un LRU con límite de
+# memoria. Las superficies son compartidas: solo blitearlas, nunca dibujar
+# encima ni cambiar su alfa (para eso, .copy()).
+#
+# Cuando una pantalla recrea sus fuentes (update_layout, update_font) llama a
+# forget_font(fuente_vieja) para soltar sus entradas.
+from collections import OrderedDict
+
+TEXT_CACHE_BYTES = 32 * 1024 * 1024
+TEXT_CACHE_ENTRIES = 4096
+
+_cache = OrderedDict()  # clave -> (valor, bytes)
+_cache_bytes = 0
+_hits = 0
+_misses = 0
+
+
+def _surface_bytes(value):
+    try:
+        return value.get_width() * value.get_height() * value.get_bytesize()
+    except AttributeError:
+        return 64  # Tamaños (font.size) y otros valores pequeños
+
+
+def cached(font, key, build):
+    """Devuelve build() guardado bajo (font, key); build solo se llama en un fallo."""
+    global _cache_bytes, _hits, _misses
+    full_key = (font, key)
+    entry = _cache.get(full_key)
+    if entry is not None:
+        _cache.move_to_end(full_key)
+        _hits += 1
+        return entry[0]
+
+    _misses += 1
+    value = build()
+    size = _surface_bytes(value)
+    _cache[full_key] = (value, size)
+    _cache_bytes += size
+    while (_cache_bytes > TEXT_CACHE_BYTES or len(_cache) > TEXT_CACHE_ENTRIES) and len(_cache) > 1:
+        _, (_, old_size) = _cache.popitem(last=False)
+        _cache_bytes -= old_size
+    return value
+
+
+def render(font, text, antialias, color, background=None):
+    """Igual que font.render(text, antialias, color, background), pero en caché."""
+    color = tuple(color)
+    if background is not None:
+        background = tuple(background)
+    return cached(font, ("render", text, color, bool(antialias), background),
+                  lambda: font.render(text, antialias, color, background))
+
+
+def size(font, text):
+    """Igual que font.size(text), pero en caché."""
+    return cached(font, ("size", text), lambda: font.size(text))
+
+
+def forget_font(font):
+    """Suelta todas las entradas de font (se llama al recrear las fuentes)."""
+    global _cache_bytes
+    if font is None:
+        return
+    for key in [k for k in _cache if k[0] is font]:
+        _cache_bytes -= _cache.pop(key)[1]
+
+
+def clear():
+    global _cache_bytes
+    _cache.clear()
+    _cache_bytes = 0
+
+
+def take_stats():
+    """Devuelve (aciertos, fallos) desde la última llamada y reinicia los contadores."""
+    global _hits, _misses
+    stats = (_hits, _misses)
+    _hits = _misses = 0
+    return stats
+
+
+def info():
+    return {"entries": len(_cache), "bytes": _cache_bytes}
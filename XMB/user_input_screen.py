@@ -3,6 +3,7 @@ import pygame
 import time
 import math
 from utils import make_gradient
+import text_cache
 from warning_screen import FilledWave, apply_blur   # reutilizamos ola y blur
 
 class UserInputScreen:
@@ -10,6 +11,8 @@ class UserInputScreen:
         self.font = font
         self.username = default_name
         self.start_time = time.perf_counter()
+        self.title_font = pygame.font.Font(None, 32)
+        self.instr_font = pygame.font.Font(None, 26)
 
         # Olas como en main.py (puedes ajustar alturas si quieres)
         self.waves = [
@@ -52,8 +55,7 @@ class UserInputScreen:
         center_y = (top_margin + bottom_margin) // 2
 
         # Título
-        title_font = pygame.font.Font(None, 32)
-        title = title_font.render("Introduzca un nombre de usuario.", True, (255, 255, 255))
+        title = text_cache.render(self.title_font, "Introduzca un nombre de usuario.", True, (255, 255, 255))
         screen.blit(title, (W // 2 - title.get_width() // 2, center_y - 80))
 
         # Caja de entrada
@@ -64,7 +66,7 @@ class UserInputScreen:
         screen.blit(box_surface, input_rect.topleft)
 
         # Texto del input
-        text_surface = self.font.render(self.username, True, (255, 255, 255))
+        text_surface = text_cache.render(self.font, self.username, True, (255, 255, 255))
         screen.blit(text_surface, (input_rect.x + 10, input_rect.y + 8))
 
         # Botón OK (parpadeante)
@@ -79,13 +81,12 @@ class UserInputScreen:
         pygame.draw.rect(screen, ok_color, ok_rect, border_radius=4)
         pygame.draw.rect(screen, (255, 255, 255), ok_rect, 2, border_radius=4)
 
-        ok_text = self.font.render("OK", True, (0, 0, 0))
+        ok_text = text_cache.render(self.font, "OK", True, (0, 0, 0))
         screen.blit(ok_text, (ok_rect.centerx - ok_text.get_width() // 2,
                               ok_rect.centery - ok_text.get_height() // 2))
 
         # Instrucciones bajo la barra inferior
-        instr_font = pygame.font.Font(None, 26)
-        instr_text = instr_font.render("✕ Editar        ○ Atrás", True, (255, 255, 255))
+        instr_text = text_cache.render(self.instr_font, "✕ Editar        ○ Atrás", True, (255, 255, 255))
         screen.blit(instr_text, (W // 2 - instr_text.get_width() // 2, bottom_margin + 30))
 
         return input_rect, ok_rect
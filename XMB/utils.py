@@ -1,5 +1,7 @@
-import math, datetime, numpy as np
+import math, datetime, threading, numpy as np
 import pygame
+from collections import OrderedDict
+import text_cache
 
 MONTH_RGB = {
     1: (160,160,170), 2: (225,205,70), 3: (115,200,100), 4: (230,140,185),
@@ -35,23 +37,66 @@ def month_color(now):
     col = np.clip(col * (0.6 + 0.4*b), 0, 255)
     return tuple(col.astype(int))
 
+# Caché de gradientes: (tamaño, top, bottom) -> Surface, LRU por número de entradas.
+# Caben los 10 COLOR_PRESETS de wave.py al tamaño de render más los fondos fijos de
+# las otras pantallas (screen, user_input_screen, warning_screen), así recorrer los
+# presets en el tema no reconstruye nada tras la primera vuelta.
+# Se usa desde el hilo principal, ThreadedWave y WaveLoopCache: protegida con _gradient_lock
+GRADIENT_CACHE_ENTRIES = 16
+_gradient_cache = OrderedDict()
+_gradient_lock = threading.Lock()
+
+def get_gradient(size, top_rgb, bottom_rgb):
+    """
+    Devuelve una Surface con el gradiente vertical de top_rgb a bottom_rgb.
+    La columna se calcula con NumPy y se estira con un solo scale; el resultado
+    se guarda en caché, así que es compartido: solo blitearlo, no dibujar encima.
+    """
+    W, H = int(size[0]), int(size[1])
+    top = tuple(int(c) for c in top_rgb[:3])
+    bottom = tuple(int(c) for c in bottom_rgb[:3])
+    key = ((W, H), top, bottom)
+    with _gradient_lock:
+        surf = _gradient_cache.get(key)
+        if surf is not None:
+            _gradient_cache.move_to_end(key)
+            return surf
+
+    t = np.arange(H, dtype=np.float64)[:, np.newaxis] / max(H - 1, 1)
+    top_arr = np.array(top, dtype=np.float64)
+    column = (top_arr + (np.array(bottom, dtype=np.float64) - top_arr) * t).astype(np.uint8)
+    column_surf = pygame.Surface((1, H))
+    pygame.surfarray.blit_array(column_surf, column[np.newaxis, :, :])
+    surf = pygame.transform.scale(column_surf, (W, H))
+    if pygame.display.get_surface() is not None:
+        surf = surf.convert()  # Mismo formato que la pantalla: blits más rápidos
+
+    # Se construye fuera del lock; si otro hilo se adelantó, se usa la suya
+    with _gradient_lock:
+        cached = _gradient_cache.get(key)
+        if cached is not None:
+            _gradient_cache.move_to_end(key)
+            return cached
+        _gradient_cache[key] = surf
+        while len(_gradient_cache) > GRADIENT_CACHE_ENTRIES:
+            _gradient_cache.popitem(last=False)
+    return surf
+
 def make_gradient(surface, top_rgb, bottom_rgb):
-    W, H = surface.get_size()
-    for y in range(H):
-        t = y/(H-1)
-        r = int(lerp(top_rgb[0], bottom_rgb[0], t))
-        g = int(lerp(top_rgb[1], bottom_rgb[1], t))
-        b = int(lerp(top_rgb[2], bottom_rgb[2], t))
-        pygame.draw.line(surface, (r,g,b), (0,y), (W,y))
+    surface.blit(get_gradient(surface.get_size(), top_rgb, bottom_rgb), (0, 0))
 
 def render_multiline_text_surface(text, font, color, max_width):
+    """Texto partido en líneas de max_width. Queda en text_cache: no dibujar encima."""
+    return text_cache.cached(font, ("multiline", text, tuple(color), max_width),
+                             lambda: _render_multiline_text_surface(text, font, color, max_width))
+
+def _render_multiline_text_surface(text, font, color, max_width):
     lines = []
     words = text.split()
     current_line = ''
     for word in words:
         test_line = current_line + word + ' '
-        test_surf = font.render(test_line, True, color)
-        if test_surf.get_width() > max_width and current_line != '':
+        if font.size(test_line)[0] > max_width and current_line != '':
             lines.append(current_line)
             current_line = word + ' '
         else:
@@ -3,6 +3,7 @@ import pygame
 from PIL import Image, ImageFilter
 import numpy as np
 from utils import make_gradient, month_color, render_multiline_text_surface, clamp, sample_spline
+import text_cache
 
 # --- Clase de ola rellena ---
 class FilledWave:
@@ -37,14 +38,53 @@ def apply_blur(surf, radius=4):
     img = img.filter(ImageFilter.GaussianBlur(radius))
     return pygame.image.fromstring(img.tobytes(), img.size, "RGBA")
 
+WARNING_TEXT = (
+    "SOBRE LA EPILEPSIA FOTOSENSIBLE\n\n"
+    "SI HA PADECIDO EPISODIOS PREVIOS DE EPILEPSIA O CONVULSIONES, CONSULTE A SU MÉDICO ANTES DE UTILIZAR ESTE PRODUCTO. "
+    "CIERTOS PATRONES LUMÍNICOS PUEDEN PROVOCAR CONVULSIONES A USUARIOS QUE NO TENGAN UN HISTORIAL PREVIO. "
+    "ANTES DE UTILIZAR ESTE PRODUCTO, LEA EL MANUAL DE INSTRUCCIONES DETENIDAMENTE."
+)
+
+def create_warning_waves(H):
+    base_color = month_color(datetime.datetime.now())
+    wave1 = FilledWave(H * 0.55, 20, 40, 16, base_color, alpha=255)
+    darker = tuple(clamp(int(c * 0.7), 0, 255) for c in base_color)
+    wave2 = FilledWave(H * 0.58, 15, 32, 12, darker, alpha=160)
+    return [wave1, wave2]
+
+def draw_warning_frame(screen, font, waves, t, alpha=255, warning_text=WARNING_TEXT):
+    """Dibuja un frame del aviso: gradiente, olas desenfocadas, overlay y texto."""
+    W, H = screen.get_size()
+    now = datetime.datetime.now()
+    bg = month_color(now)
+    bg_bottom = tuple(int(c * 0.55) for c in bg)
+    make_gradient(screen, bg, bg_bottom)
+
+    wave_layer = pygame.Surface((W, H), pygame.SRCALPHA)
+    for w in waves:
+        w.draw(wave_layer, W, H, t)
+
+    blurred = apply_blur(wave_layer, radius=6)
+    screen.blit(blurred, (0, 0))
+
+    overlay = pygame.Surface((W, H), pygame.SRCALPHA)
+    overlay.fill((15, 15, 15, 170))
+    screen.blit(overlay, (0, 0))
+
+    text_surf = render_multiline_text_surface(warning_text, font, (255, 255, 255), int(W * 0.92))
+    scale_factor = min(W * 0.9 / text_surf.get_width(), H * 0.65 / text_surf.get_height())
+    new_size = (int(text_surf.get_width() * scale_factor), int(text_surf.get_height() * scale_factor))
+    # Clave propia de esta pantalla: es la única que cambia el alfa de esta superficie
+    scaled_text = text_cache.cached(font, ("warning_scaled", warning_text, new_size),
+                                    lambda: pygame.transform.smoothscale(text_surf, new_size))
+    x = (W - scaled_text.get_width()) // 2
+    y = (H - scaled_text.get_height()) // 2
+
+    scaled_text.set_alpha(alpha)
+    screen.blit(scaled_text, (x, y))
+
 def show_warning(screen, font):
     W, H = screen.get_size()
-    warning_text = (
-        "SOBRE LA EPILEPSIA FOTOSENSIBLE\n\n"
-        "SI HA PADECIDO EPISODIOS PREVIOS DE EPILEPSIA O CONVULSIONES, CONSULTE A SU MÉDICO ANTES DE UTILIZAR ESTE PRODUCTO. "
-        "CIERTOS PATRONES LUMÍNICOS PUEDEN PROVOCAR CONVULSIONES A USUARIOS QUE NO TENGAN UN HISTORIAL PREVIO. "
-        "ANTES DE UTILIZAR ESTE PRODUCTO, LEA EL MANUAL DE INSTRUCCIONES DETENIDAMENTE."
-    )
 
     # Inicializar mixer y reproducir sonido startup
     pygame.mixer.init()
@@ -60,11 +100,7 @@ def show_warning(screen, font):
     clock = pygame.time.Clock()
 
     # Crear olas de fondo
-    base_color = month_color(datetime.datetime.now())
-    wave1 = FilledWave(H * 0.55, 20, 40, 16, base_color, alpha=255)
-    darker = tuple(clamp(int(c * 0.7), 0, 255) for c in base_color)
-    wave2 = FilledWave(H * 0.58, 15, 32, 12, darker, alpha=160)
-    waves = [wave1, wave2]
+    waves = create_warning_waves(H)
 
     t0 = time.perf_counter()
     show_warning_flag = True
@@ -78,30 +114,6 @@ def show_warning(screen, font):
             elif e.type == pygame.KEYDOWN or e.type == pygame.MOUSEBUTTONDOWN:
                 show_warning_flag = False
 
-        now = datetime.datetime.now()
-        bg = month_color(now)
-        bg_bottom = tuple(int(c * 0.55) for c in bg)
-        make_gradient(screen, bg, bg_bottom)
-
-        wave_layer = pygame.Surface((W, H), pygame.SRCALPHA)
-        t = time.perf_counter() - t0
-        for w in waves:
-            w.draw(wave_layer, W, H, t)
-
-        blurred = apply_blur(wave_layer, radius=6)
-        screen.blit(blurred, (0, 0))
-
-        overlay = pygame.Surface((W, H), pygame.SRCALPHA)
-        overlay.fill((15, 15, 15, 170))
-        screen.blit(overlay, (0, 0))
-
-        text_surf = render_multiline_text_surface(warning_text, font, (255, 255, 255), int(W * 0.92))
-        scale_factor = min(W * 0.9 / text_surf.get_width(), H * 0.65 / text_surf.get_height())
-        new_size = (int(text_surf.get_width() * scale_factor), int(text_surf.get_height() * scale_factor))
-        scaled_text = pygame.transform.smoothscale(text_surf, new_size)
-        x = (W - scaled_text.get_width()) // 2
-        y = (H - scaled_text.get_height()) // 2
-
         elapsed = time.perf_counter() - aviso_start
         alpha = 255
         if elapsed > aviso_duracion - aviso_fade_time:
@@ -109,7 +121,6 @@ def show_warning(screen, font):
         if elapsed > aviso_duracion:
             break
 
-        scaled_text.set_alpha(alpha)
-        screen.blit(scaled_text, (x, y))
+        draw_warning_frame(screen, font, waves, time.perf_counter() - t0, alpha)
 
         pygame.display.flip()
@@ -3,6 +3,10 @@ import pygame.gfxdraw
 import numpy as np
 import math
 import time
+import threading
+import zlib
+from utils import get_gradient
+import log
 
 FPS = 30
 MESH_SIZE = 40
@@ -48,18 +52,38 @@ TOUCH_ACCEL_DURATION = 3.0
 animation_speed_factor = ANIMATION_SPEED_MIN
 last_touch_time = None
 
+# ⚙️ True = FlowEngine (NumPy), False = bucle escalar original (para comparar)
+USE_NUMPY_FLOW = True
+
+# ⚙️ Backend de rasterizado de la malla: "gfxdraw" (un polígono por quad) o "numpy" (MeshRasterizer)
+RASTER_BACKEND = "gfxdraw"
+
+# 🖼️ Escala interna de render de las olas y el gradiente (se reescala con smoothscale)
+RENDER_SCALES = [0.25, 0.5, 0.75, 1.0]
+RENDER_SCALE = 1.0
+
+# 🎚️ Nivel de detalle adaptativo: resoluciones de malla y presupuesto de dibujo por frame
+ADAPTIVE_LOD = True
+MESH_LOD_PRESETS = [20, 30, 40, 60, 80, 100]
+MESH_LOD_MIN = 20  # Malla mínima en equipos lentos; poner MESH_SIZE para no bajar nunca de la original
+WAVE_FRAME_BUDGET_MS = 8.0  # Solo la malla (proyección + rasterizado), sin gradiente ni smoothscale
+LOD_COOLDOWN_FRAMES = 90  # Frames de espera tras un cambio antes de volver a decidir
+
+# 🔁 Caché del bucle en reposo: sin(T), cos(0.5·T) y sin(0.7·T) se repiten cada 20π
+USE_LOOP_CACHE = False
+LOOP_PERIOD = 20 * math.pi
+LOOP_CACHE_FRAMES = 240
+
+# 🧵 Render de las olas en un hilo de trabajo con doble búfer. Desactivado por defecto:
+# con el backend "gfxdraw" casi todo el trabajo son llamadas por polígono que no
+# sueltan el GIL, así que el hilo apenas se solapa con el bucle principal
+USE_THREADED_WAVE = False
+THREADED_WAVE_FPS = 60  # Límite del hilo para no acaparar el GIL
+
 # --- Función para crear gradiente ---
 def make_gradient(surface, top_color, bottom_color):
     """Crea un gradiente vertical de top_color a bottom_color."""
-    width, height = surface.get_size()
-    top_r, top_g, top_b = top_color
-    bot_r, bot_g, bot_b = bottom_color
-    for y in range(height):
-        t = y / (height - 1)
-        r = int(top_r + t * (bot_r - top_r))
-        g = int(top_g + t * (bot_g - top_g))
-        b = int(top_b + t * (bot_b - top_b))
-        pygame.draw.line(surface, (r, g, b), (0, y), (width, y))
+    surface.blit(get_gradient(surface.get_size(), top_color, bottom_color), (0, 0))
 
 # --- Utils matemáticos ---
 def rotate_x(point, angle_rad):
@@ -86,6 +110,11 @@ def generate_flow_mesh(size, stretch_x=2.0, stretch_y=0.7):
             points.append([x, y, z])
     return np.array(points, dtype=np.float32)
 
+def scaled_flow_mesh(size):
+    """Malla de size x size con la misma extensión que la de MESH_SIZE."""
+    stretch = MESH_SIZE / size
+    return generate_flow_mesh(size, stretch_x=2.0 * stretch, stretch_y=0.7 * stretch)
+
 def update_flow(points, time_sec, speed_factor=1.0):
     for idx, (x, y, _) in enumerate(points):
         z_new = (
@@ -95,6 +124,109 @@ def update_flow(points, time_sec, speed_factor=1.0):
         ) * AMPLITUDE
         points[idx][2] = z_new
 
+class FlowEngine:
+    """
+    Versión vectorizada de update_flow.
+    Precalcula las columnas x/y de la malla y calcula todo el campo z con
+    unas pocas ufuncs de NumPy, escribiendo en buffers preasignados
+    (sin asignaciones de memoria por frame).
+    amplitude / camera_distance permiten reutilizarlo con otros parámetros
+    (cosmicflow.py); por defecto usa AMPLITUDE y CAMERA_DISTANCE de este módulo.
+    """
+    def __init__(self, points, amplitude=None, camera_distance=None):
+        self.points = points
+        self.amplitude = amplitude
+        self.camera_distance = camera_distance
+        x = points[:, 0].astype(np.float64)
+        y = points[:, 1].astype(np.float64)
+        # Fases fijas de cada término (float64 para no perder precisión con t grande)
+        self.phase_x = x * 0.4
+        self.phase_y = y * 0.6
+        self.phase_xy = x * 0.3 + y * 0.3
+        self.z = np.empty_like(self.phase_x)
+        self.tmp = np.empty_like(self.phase_x)
+        self.z_column = points[:, 2]  # Vista sobre la columna z de la malla
+        # Buffers de la etapa de rotación/proyección
+        self.x = x
+        self.y = y
+        self.rot_x = np.empty_like(x)
+        self.rot_y = np.empty_like(x)
+        self.rot_z = np.empty_like(x)
+        self.factor = np.empty_like(x)
+        self.projected = np.empty((len(points), 2), dtype=np.int32)
+
+    def update(self, time_sec, speed_factor=1.0):
+        t = time_sec * speed_factor
+        z, tmp = self.z, self.tmp
+        np.add(self.phase_x, t, out=z)
+        np.sin(z, out=z)
+        np.add(self.phase_y, t * 0.5, out=tmp)
+        np.cos(tmp, out=tmp)
+        z += tmp
+        np.add(self.phase_xy, t * 0.7, out=tmp)
+        np.sin(tmp, out=tmp)
+        z += tmp
+        np.multiply(z, AMPLITUDE if self.amplitude is None else self.amplitude, out=self.z_column)
+
+    def project(self, angle_x_rad, width, height, scale=1.0, angle_y_rad=0.0):
+        """
+        Rota en X y proyecta todos los vértices de una vez: (N, 3) -> (N, 2).
+        Equivale a rotate_x + project_point por vértice. Devuelve self.projected.
+        scale reduce la proyección para render targets a menor resolución.
+        angle_y_rad añade una rotación en Y después de la de X.
+        """
+        cos_ang = math.cos(angle_x_rad)
+        sin_ang = math.sin(angle_x_rad)
+        ry, rz, factor = self.rot_y, self.rot_z, self.factor
+        # y' = y·cos - z·sin ; z' = y·sin + z·cos
+        np.multiply(self.y, cos_ang, out=ry)
+        np.multiply(self.z_column, sin_ang, out=rz)
+        ry -= rz
+        np.multiply(self.y, sin_ang, out=rz)
+        np.multiply(self.z_column, cos_ang, out=factor)
+        rz += factor
+        rx = self.x
+        if angle_y_rad:
+            # x' = x·cos + z·sin ; z' = -x·sin + z·cos
+            cos_y = math.cos(angle_y_rad)
+            sin_y = math.sin(angle_y_rad)
+            rx = self.rot_x
+            np.multiply(self.x, cos_y, out=rx)
+            np.multiply(rz, sin_y, out=factor)
+            rx += factor
+            np.multiply(rz, cos_y, out=rz)
+            np.multiply(self.x, sin_y, out=factor)
+            rz -= factor
+        # factor = FOV / (CAMERA_DISTANCE + z')
+        np.add(rz, CAMERA_DISTANCE if self.camera_distance is None else self.camera_distance, out=factor)
+        np.divide(FOV * scale, factor, out=factor)
+        # int() trunca hacia cero, igual que project_point
+        np.multiply(rx, factor, out=rz)
+        np.trunc(rz, out=rz)
+        rz += width // 2
+        self.projected[:, 0] = rz
+        np.multiply(ry, factor, out=ry)
+        np.trunc(ry, out=ry)
+        np.subtract(height // 2, ry, out=ry)
+        self.projected[:, 1] = ry
+        return self.projected
+
+# Tablas de índices de quads, una por tamaño de malla
+_quad_tables = {}
+
+def quad_index_table(size):
+    """
+    Devuelve un array (Q, 4) con los índices de los vértices de cada quad,
+    en el orden de dibujo [p0, p1, p3, p2]. Se calcula una vez por tamaño.
+    """
+    table = _quad_tables.get(size)
+    if table is None:
+        i, j = np.meshgrid(np.arange(size - 1), np.arange(size - 1), indexing="ij")
+        idx = (i * size + j).ravel()
+        table = np.stack([idx, idx + 1, idx + size + 1, idx + size], axis=1).astype(np.intp)
+        _quad_tables[size] = table
+    return table
+
 # --- Función de luz ---
 def compute_light_intensity(px, py, width, height):
     intensity = 0
@@ -114,42 +246,200 @@ def apply_lighting(color, alpha, light):
     b = min(255, int(b * (0.5 + light)))
     return (r, g, b, alpha)
 
-def draw_flow(screen, points, size, angle_x_rad, flow_surface):
+class LightMap:
+    """
+    Mapa de luz en espacio de pantalla precalculado a partir de LIGHTS.
+    Guarda la intensidad cuantizada (0-255) de cada píxel y una paleta con
+    los colores ya iluminados, así el sombreado por frame es una consulta.
+    Solo se reconstruye al cambiar el tamaño, las luces o el preset de color.
+    """
+    def __init__(self):
+        self.size = None
+        self.scale = None
+        self.lights = None
+        self.color = None
+        self.levels = None   # (alto, ancho) uint8
+        self.palette = None  # 256 colores RGBA
+
+    def ensure(self, width, height, color, scale=1.0):
+        lights = tuple(LIGHTS)
+        if self.size != (width, height) or self.scale != scale or self.lights != lights:
+            self._build_levels(width, height, lights, scale)
+        if self.color != color:
+            self.palette = [apply_lighting(color[:3], color[3], level / 255) for level in range(256)]
+            self.palette_rgb = np.array([c[:3] for c in self.palette], dtype=np.float64)
+            self.color = color
+
+    def _build_levels(self, width, height, lights, scale):
+        xs = np.arange(width, dtype=np.float32)[np.newaxis, :]
+        ys = np.arange(height, dtype=np.float32)[:, np.newaxis]
+        intensity = np.zeros((height, width), dtype=np.float32)
+        for lx, ly, radius, power in lights:
+            lx_px = width // 2 + int(lx * 40 * scale)
+            ly_px = height // 2 - int(ly * 40 * scale)
+            dist = np.sqrt((xs - lx_px) ** 2 + (ys - ly_px) ** 2)
+            # Igual que compute_light_intensity: solo aporta dentro de radius * 50
+            intensity += power * np.maximum(1 - dist / (radius * 50 * scale), 0)
+        np.minimum(intensity, 1.0, out=intensity)
+        self.levels = np.rint(intensity * 255).astype(np.uint8)
+        self.size = (width, height)
+        self.scale = scale
+        self.lights = lights
+        print(f"[LightMap] Rebuilt light map {width}x{height} (scale {scale})")
+
+    def levels_at(self, cx, cy):
+        """Nivel de luz (0-255) para arrays de centros de quad (x, y) en píxeles."""
+        height, width = self.levels.shape
+        return self.levels[np.clip(cy, 0, height - 1), np.clip(cx, 0, width - 1)]
+
+    def colors(self, cx, cy):
+        """Colores iluminados (tuplas RGBA) para arrays de centros de quad."""
+        palette = self.palette
+        return [palette[level] for level in self.levels_at(cx, cy).tolist()]
+
+# Mapa de luz compartido para draw_flow cuando no se pasa uno propio
+_shared_light_map = LightMap()
+
+# Marca de "sin intersección" para las scanlines del rasterizador
+_NO_HIT = np.iinfo(np.int64).max
+
+class MeshRasterizer:
+    """
+    Backend NumPy alternativo a gfxdraw.filled_polygon.
+    Rasteriza todos los quads proyectados en una sola pasada con la misma regla
+    de scanlines que SDL_gfx y los mezcla en orden de dibujo con su misma
+    fórmula (RGB += (color - RGB) * alpha / 256, alpha final = alpha² / 256).
+    El buffer es un array uint32 expuesto como Surface SRCALPHA sin copias.
+    """
+    def __init__(self):
+        self.size = None
+        self.buffer = None
+        self.surface = None
+
+    def ensure(self, width, height):
+        if self.size != (width, height):
+            self.buffer = np.zeros((height, width), dtype=np.uint32)
+            self.surface = pygame.image.frombuffer(self.buffer, (width, height), "BGRA")
+            self.size = (width, height)
+
+    def spans(self, corners):
+        """Devuelve (y, x_inicio, x_fin, quad) de cada span horizontal, en orden de dibujo."""
+        width, height = self.size
+        # gfxdraw recibe coordenadas Sint16
+        corners = ((corners.astype(np.int64) + 32768) & 0xFFFF) - 32768
+        vx, vy = corners[:, :, 0], corners[:, :, 1]
+        # Aristas (i-1 -> i) orientadas con y1 <= y2
+        px, py = np.roll(vx, 1, axis=1), np.roll(vy, 1, axis=1)
+        swap = py > vy
+        ey1 = np.where(swap, vy, py)
+        ey2 = np.where(swap, py, vy)
+        ex1 = np.where(swap, vx, px)
+        ex2 = np.where(swap, px, vx)
+        flat = ey1 == ey2
+        miny = vy.min(axis=1)
+        maxy = vy.max(axis=1)
+        first = np.maximum(miny, 0)
+        rows = np.maximum(np.minimum(maxy, height - 1) - first + 1, 0)
+        q = np.repeat(np.arange(len(corners)), rows)
+        y = ((first - (np.cumsum(rows) - rows))[q] + np.arange(len(q)))[:, np.newaxis]
+
+        # Intersección de cada scanline con las 4 aristas (coma fija 16.16)
+        y1, y2 = ey1[q], ey2[q]
+        hit = ((y >= y1) & (y < y2)) | ((y == maxy[q][:, np.newaxis]) & (y > y1) & (y <= y2))
+        hit &= ~flat[q]
+        x1 = ex1[q]
+        dy = np.where(hit, y2 - y1, 1)
+        ints = ((65536 * (y - y1)) // dy) * (ex2[q] - x1) + 65536 * x1
+        ints[~hit] = _NO_HIT
+        ints.sort(axis=1)
+
+        # Pares de intersecciones (0,1) y (2,3) -> spans, redondeados como SDL_gfx
+        xa = ints[:, 0::2] + 1
+        xb = ints[:, 1::2] - 1
+        valid = (ints[:, 1::2] != _NO_HIT).ravel()
+        xa = ((xa >> 16) + ((xa & 32768) >> 15)).ravel()[valid]
+        xb = ((xb >> 16) + ((xb & 32768) >> 15)).ravel()[valid]
+        ys = np.repeat(y[:, 0], 2)[valid]
+        qs = np.repeat(q, 2)[valid]
+        lo = np.maximum(np.minimum(xa, xb), 0)
+        hi = np.minimum(np.maximum(xa, xb), width - 1)
+        keep = lo <= hi
+        return ys[keep], lo[keep], hi[keep], qs[keep]
+
+    def draw(self, corners, colors, alpha):
+        """
+        corners: (Q, 4, 2) vértices proyectados; colors: (Q, 3) RGB por quad.
+        Devuelve la Surface con la malla mezclada sobre transparente.
+        """
+        width = self.size[0]
+        self.buffer.fill(0)
+        ys, lo, hi, qs = self.spans(corners)
+        lengths = hi - lo + 1
+        total = int(lengths.sum())
+        if total == 0:
+            return self.surface
+
+        # Fragmentos (un píxel por quad) en orden de dibujo
+        span = np.repeat(np.arange(len(lengths)), lengths)
+        pix = (ys * width + lo - (np.cumsum(lengths) - lengths))[span] + np.arange(total)
+        order = np.argsort(pix, kind="stable")
+        pix = pix[order]
+        frag_q = qs[span[order]]
+
+        # Capas por píxel: cada capa posterior atenúa las anteriores por (1 - w)
+        starts = np.flatnonzero(np.r_[True, pix[1:] != pix[:-1]])
+        counts = np.diff(np.r_[starts, total])
+        after = np.repeat(starts + counts, counts) - np.arange(total) - 1
+        w = alpha / 256
+        weights = (w * (1 - w) ** np.arange(counts.max()))[after]
+
+        group = np.repeat(np.arange(len(starts)), counts)
+        packed = np.full(len(starts), (alpha * alpha >> 8) << 24, dtype=np.uint32)
+        for channel, shift in ((0, 16), (1, 8), (2, 0)):
+            value = np.bincount(group, weights=colors[:, channel][frag_q] * weights)
+            packed |= value.astype(np.uint32) << shift
+        self.buffer.ravel()[pix[starts]] = packed
+        return self.surface
+
+def draw_flow(screen, points, size, angle_x_rad, flow_surface, projected=None, light_map=None, rasterizer=None, scale=1.0):
+    """Dibuja la malla. Devuelve los segundos de la parte que depende de la malla (sin fill ni blit)."""
     global PINK_COLOR
     flow_surface.fill((0, 0, 0, 0))
     width, height = flow_surface.get_size()
 
-    for i in range(size - 1):
-        for j in range(size - 1):
-            idx = i * size + j
-            p0 = points[idx]
-            p1 = points[idx + 1]
-            p2 = points[idx + size]
-            p3 = points[idx + size + 1]
-
-            p0r = rotate_x(p0, angle_x_rad)
-            p1r = rotate_x(p1, angle_x_rad)
-            p2r = rotate_x(p2, angle_x_rad)
-            p3r = rotate_x(p3, angle_x_rad)
-
-            pp0 = project_point(*p0r, width, height)
-            pp1 = project_point(*p1r, width, height)
-            pp2 = project_point(*p2r, width, height)
-            pp3 = project_point(*p3r, width, height)
-
-            cx = (pp0[0] + pp1[0] + pp2[0] + pp3[0]) // 4
-            cy = (pp0[1] + pp1[1] + pp2[1] + pp3[1]) // 4
-            light = compute_light_intensity(cx, cy, width, height)
-
-            color = apply_lighting(PINK_COLOR[:3], PINK_COLOR[3], light)
-
-            pygame.gfxdraw.filled_polygon(
-                flow_surface,
-                [pp0, pp1, pp3, pp2],
-                color
-            )
+    start = time.perf_counter()
+    # Cada vértice se rota y proyecta una sola vez; los quads solo hacen gathers
+    if projected is None:
+        projected = FlowEngine(points).project(angle_x_rad, width, height, scale)
+    corners = projected[quad_index_table(size)]  # (Q, 4, 2)
+    centers = corners.sum(axis=1) // 4
+
+    # Iluminación: consulta en el mapa de luz precalculado
+    if light_map is None:
+        light_map = _shared_light_map
+    light_map.ensure(width, height, PINK_COLOR, scale)
+
+    # Backend NumPy: toda la malla en una pasada
+    if rasterizer is not None:
+        rasterizer.ensure(width, height)
+        colors = light_map.palette_rgb[light_map.levels_at(centers[:, 0], centers[:, 1])]
+        mesh_layer = rasterizer.draw(corners, colors, PINK_COLOR[3])
+        mesh_time = time.perf_counter() - start
+        screen.blit(mesh_layer, (0, 0))
+        return mesh_time
+
+    colors = light_map.colors(centers[:, 0], centers[:, 1])
+
+    for poly, color in zip(corners.tolist(), colors):
+        pygame.gfxdraw.filled_polygon(
+            flow_surface,
+            poly,
+            color
+        )
+    mesh_time = time.perf_counter() - start
 
     screen.blit(flow_surface, (0, 0))
+    return mesh_time
 
 def handle_touch():
     global animation_speed_factor, last_touch_time
@@ -168,6 +458,121 @@ def update_animation_speed():
         progress = elapsed / TOUCH_ACCEL_DURATION
         animation_speed_factor = ANIMATION_SPEED_MAX - (ANIMATION_SPEED_MAX - ANIMATION_SPEED_MIN) * progress
 
+class MeshLODGovernor:
+    """
+    Sube o baja la resolución de la malla entre MESH_LOD_PRESETS para que el
+    tiempo de la malla se mantenga dentro de WAVE_FRAME_BUDGET_MS. Se mide
+    solo la proyección y el rasterizado: el gradiente, los blits y el
+    smoothscale cuestan lo mismo con cualquier malla. Usa una media
+    exponencial, un enfriamiento tras cada cambio y solo sube si el coste
+    estimado del siguiente preset sigue cabiendo en el presupuesto. Nunca
+    baja de MESH_LOD_MIN.
+    """
+    def __init__(self, size, presets=None, budget_ms=None, min_size=None):
+        min_size = MESH_LOD_MIN if min_size is None else min_size
+        self.presets = sorted(p for p in (presets or MESH_LOD_PRESETS) if p >= min_size) or [max(size, min_size)]
+        self.budget_ms = budget_ms or WAVE_FRAME_BUDGET_MS
+        # Empezar en el preset más cercano al tamaño actual
+        self.index = min(range(len(self.presets)), key=lambda i: abs(self.presets[i] - size))
+        self.avg_ms = None
+        self.cooldown = LOD_COOLDOWN_FRAMES
+
+    @staticmethod
+    def quad_count(size):
+        return (size - 1) ** 2
+
+    def record(self, draw_ms):
+        """Registra el tiempo de malla de un frame. Devuelve el nuevo tamaño de malla o None."""
+        self.avg_ms = draw_ms if self.avg_ms is None else self.avg_ms * 0.9 + draw_ms * 0.1
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return None
+        size = self.presets[self.index]
+        if self.avg_ms > self.budget_ms * 1.15 and self.index > 0:
+            self.index -= 1
+        elif self.index < len(self.presets) - 1:
+            next_size = self.presets[self.index + 1]
+            predicted = self.avg_ms * self.quad_count(next_size) / self.quad_count(size)
+            if predicted > self.budget_ms * 0.9:
+                return None
+            self.index += 1
+        else:
+            return None
+        self.avg_ms = None
+        self.cooldown = LOD_COOLDOWN_FRAMES
+        return self.presets[self.index]
+
+class WaveLoopCache:
+    """
+    Caché de la animación en reposo. Con animation_speed_factor en
+    ANIMATION_SPEED_MIN la superficie solo depende de la fase dentro de
+    LOOP_PERIOD, así que un hilo de fondo renderiza N frames del bucle
+    (gradiente + malla) y los guarda comprimidos con zlib. Mientras tanto, y
+    siempre que el impulso táctil esté activo, se sigue dibujando en vivo.
+    """
+    def __init__(self, key, render_size, mesh_size, angle_x, render_scale, frames=None):
+        self.key = key
+        self.render_size = render_size
+        self.mesh_size = mesh_size
+        self.angle_x = angle_x
+        self.render_scale = render_scale
+        self.frames = [None] * (frames or LOOP_CACHE_FRAMES)
+        self.built = 0
+        self.cancelled = False
+        self.decoded = {}  # índice -> Surface ya descomprimida (solo las 2 en uso)
+        self.thread = threading.Thread(target=self._build, daemon=True)
+        self.thread.start()
+
+    def is_complete(self):
+        return self.built == len(self.frames)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _build(self):
+        width, height = self.render_size
+        count = len(self.frames)
+        points = scaled_flow_mesh(self.mesh_size)
+        engine = FlowEngine(points)
+        light_map = LightMap()
+        gradient = get_gradient(self.render_size, BG_TOP, BG_BOTTOM)
+        frame = pygame.Surface(self.render_size)
+        flow_surface = pygame.Surface(self.render_size, pygame.SRCALPHA)
+        for k in range(count):
+            if self.cancelled:
+                return
+            engine.update(k / count * LOOP_PERIOD, speed_factor=1.0)
+            frame.blit(gradient, (0, 0))
+            projected = engine.project(self.angle_x, width, height, self.render_scale)
+            draw_flow(frame, points, self.mesh_size, self.angle_x, flow_surface, projected, light_map, None, self.render_scale)
+            self.frames[k] = zlib.compress(pygame.image.tobytes(frame, "RGB"), 1)
+            self.built = k + 1
+            time.sleep(0.002)  # Ceder tiempo al hilo principal
+        size_mb = sum(len(blob) for blob in self.frames) / (1024 * 1024)
+        print(f"[WaveLoopCache] {count} frames cached ({size_mb:.1f} MB)")
+
+    def _frame(self, index, target):
+        surf = self.decoded.get(index)
+        if surf is None:
+            surf = pygame.image.frombytes(zlib.decompress(self.frames[index]), self.render_size, "RGB")
+            surf = surf.convert(target)  # Mismo formato que el destino: blit directo
+            self.decoded = {k: v for k, v in self.decoded.items() if k in (index - 1, index)}
+            self.decoded[index] = surf
+        return surf
+
+    def draw(self, target, phase_time):
+        """Dibuja el frame del bucle para el tiempo T = elapsed * ANIMATION_SPEED_MIN."""
+        count = len(self.frames)
+        position = (phase_time % LOOP_PERIOD) / LOOP_PERIOD * count
+        index = int(position) % count
+        base = self._frame(index, target)
+        base.set_alpha(None)  # Pudo quedar con el alfa del fundido anterior, cuando era la siguiente
+        target.blit(base, (0, 0))
+        # Fundido con el frame siguiente para suavizar la reproducción
+        following = self._frame((index + 1) % count, target)
+        following.set_alpha(int((position - int(position)) * 255))
+        target.blit(following, (0, 0))
+
 class CosmicWave:
     def __init__(self, width, height):
         global PINK_COLOR, BG_TOP, BG_BOTTOM
@@ -175,35 +580,191 @@ class CosmicWave:
         self.height = height
         self.size = MESH_SIZE
         self.angle_x = math.radians(85)
-        self.points = generate_flow_mesh(self.size, stretch_x=2.0, stretch_y=0.7)
-        self.flow_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-        self.gradient_surface = pygame.Surface((width, height))  # Superficie para el gradiente
-        self.update_gradient()  # Crear gradiente inicial
+        self.points = scaled_flow_mesh(self.size)
+        self.flow_engine = FlowEngine(self.points)
+        self.flow_time = 0.0
+        self.flow_speed = animation_speed_factor
+        self.lod = MeshLODGovernor(self.size) if ADAPTIVE_LOD else None
+        self.loop_cache = None
+        self.light_map = LightMap()
+        self.rasterizer = MeshRasterizer()
+        self.use_numpy_flow = USE_NUMPY_FLOW
+        self.raster_backend = RASTER_BACKEND
+        self.gradient_surface = None  # Superficie del gradiente (compartida desde la caché)
+        self.allocate_surfaces()  # Superficies de render + gradiente inicial
         self.start_time = time.time()
 
+    def allocate_surfaces(self):
+        """(Re)crea las superficies de render según el tamaño y RENDER_SCALE."""
+        self.render_scale = RENDER_SCALE
+        self.render_size = (max(1, int(self.width * self.render_scale)), max(1, int(self.height * self.render_scale)))
+        self.flow_surface = pygame.Surface(self.render_size, pygame.SRCALPHA)
+        if self.render_scale < 1.0:
+            # Olas + gradiente a resolución reducida, luego smoothscale a pantalla
+            self.render_surface = pygame.Surface(self.render_size)
+            self.upscale_surface = pygame.Surface((self.width, self.height))
+        else:
+            self.render_surface = None
+            self.upscale_surface = None
+        self.update_gradient()
+
     def update_gradient(self):
         """Actualiza el gradiente con los colores actuales."""
         global BG_TOP, BG_BOTTOM
-        make_gradient(self.gradient_surface, BG_TOP, BG_BOTTOM)
+        self.gradient_surface = get_gradient(self.render_size, BG_TOP, BG_BOTTOM)
         print(f"[CosmicWave] Updated gradient: BG_TOP={BG_TOP}, BG_BOTTOM={BG_BOTTOM}")
 
+    def set_mesh_size(self, size):
+        """
+        Regenera la malla con otra resolución conservando su extensión en el
+        mundo, así la superficie es la misma y solo cambia la densidad de quads.
+        """
+        self.size = size
+        self.points = scaled_flow_mesh(size)
+        self.flow_engine = FlowEngine(self.points)
+        # Calcular z ya mismo para no mostrar un frame con la malla plana
+        self.flow_engine.update(self.flow_time, speed_factor=self.flow_speed)
+        print(f"[CosmicWave] Mesh LOD -> {size}x{size}")
+
+    def draw_from_loop_cache(self, target):
+        """Dibuja desde WaveLoopCache si está activa, completa y no hay impulso táctil."""
+        if not USE_LOOP_CACHE:
+            if self.loop_cache is not None:
+                self.loop_cache.cancel()
+                self.loop_cache = None
+            return False
+        key = (self.render_size, self.render_scale, PINK_COLOR, BG_TOP, BG_BOTTOM, tuple(LIGHTS))
+        if self.loop_cache is None or self.loop_cache.key != key:
+            if self.loop_cache is not None:
+                self.loop_cache.cancel()
+            self.loop_cache = WaveLoopCache(key, self.render_size, self.size, self.angle_x, self.render_scale)
+        if self.flow_speed != ANIMATION_SPEED_MIN or not self.loop_cache.is_complete():
+            return False
+        self.loop_cache.draw(target, self.flow_time * ANIMATION_SPEED_MIN)
+        return True
+
     def update(self):
         elapsed_time = (time.time() - self.start_time) * BASE_ANIMATION_SPEED
         update_animation_speed()
-        update_flow(self.points, elapsed_time, speed_factor=animation_speed_factor)
+        self.flow_time = elapsed_time
+        self.flow_speed = animation_speed_factor
+        if self.use_numpy_flow:
+            self.flow_engine.update(elapsed_time, speed_factor=animation_speed_factor)
+        else:
+            update_flow(self.points, elapsed_time, speed_factor=animation_speed_factor)
 
     def draw(self, surface, *args, **kwargs):
         global PINK_COLOR, BG_TOP, BG_BOTTOM
-        if surface.get_width() != self.width or surface.get_height() != self.height:
+        if surface.get_width() != self.width or surface.get_height() != self.height or self.render_scale != RENDER_SCALE:
             self.width, self.height = surface.get_width(), surface.get_height()
-            self.flow_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-            self.gradient_surface = pygame.Surface((self.width, self.height))
-            self.update_gradient()
-        surface.blit(self.gradient_surface, (0, 0))  # Dibujar gradiente
-        draw_flow(surface, self.points, self.size, self.angle_x, self.flow_surface)
+            self.allocate_surfaces()
+        target = surface if self.render_surface is None else self.render_surface
+        if self.draw_from_loop_cache(target):
+            if self.render_surface is not None:
+                pygame.transform.smoothscale(self.render_surface, (self.width, self.height), self.upscale_surface)
+                surface.blit(self.upscale_surface, (0, 0))
+            return
+        target.blit(self.gradient_surface, (0, 0))  # Dibujar gradiente
+        render_w, render_h = self.render_size
+        start = time.perf_counter()
+        projected = self.flow_engine.project(self.angle_x, render_w, render_h, self.render_scale)
+        project_time = time.perf_counter() - start
+        rasterizer = self.rasterizer if self.raster_backend == "numpy" else None
+        mesh_time = draw_flow(target, self.points, self.size, self.angle_x, self.flow_surface, projected, self.light_map, rasterizer, self.render_scale)
+        if self.render_surface is not None:
+            pygame.transform.smoothscale(self.render_surface, (self.width, self.height), self.upscale_surface)
+            surface.blit(self.upscale_surface, (0, 0))
+        if self.lod is not None:
+            new_size = self.lod.record((project_time + mesh_time) * 1000)
+            if new_size is not None:
+                self.set_mesh_size(new_size)
+
+    def close(self):
+        if self.loop_cache is not None:
+            self.loop_cache.cancel()
+            self.loop_cache = None
+
+class ThreadedWave:
+    """
+    Envoltorio de una ola (CosmicWave o CosmicFlow) que la actualiza y dibuja en un hilo de
+    trabajo sobre dos superficies (doble búfer). El bucle principal solo
+    copia el último frame completo, así la entrada del menú no comparte el
+    presupuesto de frame con la malla. Las partes pesadas (blits, smoothscale
+    y los ufuncs grandes de NumPy) liberan el GIL; compensa sobre todo con
+    RASTER_BACKEND = "numpy". Hasta el primer frame se muestra el gradiente.
+    """
+    def __init__(self, wave, fps=None):
+        self.width = width = wave.width
+        self.height = height = wave.height
+        self.wave = wave
+        self.buffers = [pygame.Surface((width, height)), pygame.Surface((width, height))]
+        make_gradient(self.buffers[0], BG_TOP, BG_BOTTOM)  # Sin esperar al hilo: se ve el fondo enseguida
+        self.front = 0
+        self.frame_id = 0  # Aumenta con cada frame completo (el compositor lo usa para no recomponer)
+        self.lock = threading.Lock()
+        self.frame_interval = 1.0 / (fps or THREADED_WAVE_FPS)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.running:
+            start = time.perf_counter()
+            back = 1 - self.front  # Solo este hilo cambia self.front
+            try:
+                self.wave.update()
+                self.wave.draw(self.buffers[back])
+            except Exception as e:
+                log.error("ThreadedWave", f"Error renderizando ola: {e}")  # Con límite de frecuencia: puede fallar en cada frame
+                time.sleep(0.1)
+                continue
+            with self.lock:
+                self.front = back
+                self.frame_id += 1
+            elapsed = time.perf_counter() - start
+            time.sleep(max(0.001, self.frame_interval - elapsed))
+
+    def update(self):
+        pass  # La actualización ocurre en el hilo de trabajo
 
-def build_waves(width, height):
-    return [CosmicWave(width, height)]
+    def update_gradient(self):
+        self.wave.update_gradient()
+
+    def draw(self, surface, *args, **kwargs):
+        with self.lock:
+            surface.blit(self.buffers[self.front], (0, 0))
+
+    def close(self):
+        self.running = False
+        self.thread.join(1.0)
+        self.wave.close()
+
+def build_waves(width, height, threaded=None, style=None):
+    """
+    Crea las olas de fondo. style elige un estilo de cosmicflow.STYLE_PRESETS
+    ("normal", "static", "bright", "points") en lugar de CosmicWave.
+    """
+    if style is None:
+        wave = CosmicWave(width, height)
+    else:
+        from cosmicflow import CosmicFlow  # Import diferido: cosmicflow importa este módulo
+        wave = CosmicFlow(width, height, style, themed=True)
+    if threaded is None:
+        threaded = USE_THREADED_WAVE
+    if threaded:
+        return [ThreadedWave(wave)]
+    return [wave]
+
+def set_waves_fps(waves, fps):
+    """Ajusta el ritmo de los hilos de ThreadedWave (p. ej. más lento en reposo)."""
+    for wave in waves or []:
+        if isinstance(wave, ThreadedWave):
+            wave.frame_interval = 1.0 / min(fps, THREADED_WAVE_FPS)
+
+def close_waves(waves):
+    """Detiene los hilos de unas olas que se van a reemplazar."""
+    for wave in waves or []:
+        wave.close()
 
 # --- Función para cambiar el color ---
 def change_color(index):
@@ -215,6 +776,16 @@ def change_color(index):
         BG_BOTTOM = COLOR_PRESETS[current_color_index][2]
         print(f"[change_color] Updated colors: PINK_COLOR={PINK_COLOR}, BG_TOP={BG_TOP}, BG_BOTTOM={BG_BOTTOM}")
 
+# --- Escala interna de render ---
+def set_render_scale(scale):
+    global RENDER_SCALE
+    if scale in RENDER_SCALES:
+        RENDER_SCALE = scale
+        print(f"[set_render_scale] Render scale: {int(RENDER_SCALE * 100)}%")
+
+def get_render_scale():
+    return RENDER_SCALE
+
 # ---------- MAIN LOOP ----------
 if __name__ == "__main__":
     pygame.init()
@@ -222,7 +793,7 @@ if __name__ == "__main__":
     pygame.display.set_caption("Cosmic Wave - Iluminación Potente")
     clock = pygame.time.Clock()
 
-    waves = build_waves(screen.get_width(), screen.get_height())
+    waves = build_waves(screen.get_width(), screen.get_height(), threaded=False)  # N/B/L actúan sobre CosmicWave
 
     running = True
     while running:
@@ -231,9 +802,24 @@ if __name__ == "__main__":
                 running = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 handle_touch()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_n:
+                # Alternar entre FlowEngine (NumPy) y el bucle escalar
+                for wave in waves:
+                    wave.use_numpy_flow = not wave.use_numpy_flow
+                print(f"[main] USE_NUMPY_FLOW={waves[0].use_numpy_flow}")
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_b:
+                # Alternar backend de rasterizado (gfxdraw / numpy)
+                for wave in waves:
+                    wave.raster_backend = "numpy" if wave.raster_backend == "gfxdraw" else "gfxdraw"
+                print(f"[main] RASTER_BACKEND={waves[0].raster_backend}")
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_l:
+                # Alternar la caché del bucle en reposo
+                USE_LOOP_CACHE = not USE_LOOP_CACHE
+                print(f"[main] USE_LOOP_CACHE={USE_LOOP_CACHE}")
             elif event.type == pygame.VIDEORESIZE:
                 screen = pygame.display.set_mode((event.w, event.h), pygame.RESIZABLE)
-                waves = build_waves(event.w, event.h)
+                close_waves(waves)
+                waves = build_waves(event.w, event.h, threaded=False)
 
         # No se usa screen.fill() porque el gradiente se dibuja en CosmicWave.draw()
         for wave in waves:
@@ -99,6 +99,7 @@ class XMBMenu:
         self.last_y_positions = {}
         self.last_y_positions_files = {}
         self.file_list = []
+        self.file_entries = {}  # nombre -> files.FileEntry de current_path
         self.file_index = 0
         self.showing_files = False
         self.current_path = os.getcwd()
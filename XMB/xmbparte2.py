@@ -4,14 +4,34 @@ import sys
 import time
 import math
 from utils import lerp
+import text_cache
 import reloj
 from screen import ScreenSettings
 from user_input_screen import UserInputScreen
 from users import UserManager
-from images import get_image
+from images import get_image, get_scaled_image, warm_scaled_images
 from xmbparte1 import XMBMenu as XMBMenuBase
 from music import MusicVisualizer
 from theme import open_theme_settings
+from compositor import premultiplied
+from files import DirectoryLoader, DirectoryModel, SORT_MODES
+from fswatch import DirectoryWatcher
+
+OUTLINE_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+OUTLINE_ALPHA_LEVELS = 16  # Niveles de alfa del parpadeo: un sprite horneado por nivel
+BLINK_RAMP_STEPS = 64  # Fases precalculadas del ciclo de parpadeo
+LIST_MARGIN_ROWS = 2  # Filas fuera de pantalla que se siguen animando a cada lado de la ventana visible
+TYPE_AHEAD_TIMEOUT = 3.0  # Segundos sin teclear tras los que se quita el filtro del gestor de archivos
+
+
+def quantize_blink_alpha(alpha):
+    step = 255 / (OUTLINE_ALPHA_LEVELS - 1)
+    return int(round(alpha / step) * step)
+
+
+def build_blink_ramp(steps=BLINK_RAMP_STEPS):
+    """Alfa de la fila activa en cada fase del parpadeo, ya cuantizado a OUTLINE_ALPHA_LEVELS."""
+    return [quantize_blink_alpha((math.sin(i / steps * 2 * math.pi - math.pi / 2) + 1) / 2 * 255) for i in range(steps)]
 
 
 class XMBMenu(XMBMenuBase):
@@ -34,6 +54,13 @@ class XMBMenu(XMBMenuBase):
         self.submenu_transition_speed = 8
         self.jump_speed = 300
         self.blink_duration = 1.0
+        self.blink_ramp = build_blink_ramp()
+        self.dir_loader = DirectoryLoader()
+        self.dir_loading = False  # Listado de current_path todavía llegando del hilo
+        self.dir_model = DirectoryModel()
+        self.dir_watcher = DirectoryWatcher()  # Cambios en current_path mientras está abierta
+        self.type_ahead_text = ""
+        self.type_ahead_time = 0.0
         self.theme_settings = None
 
 
@@ -74,6 +101,7 @@ class XMBMenu(XMBMenuBase):
         arrow_image = get_image("F1F1F1") or self._create_default_arrow()
         self.arrow_image = pygame.transform.smoothscale(arrow_image, (self.arrow_size, self.arrow_size))
         self.music_player = None
+        self.warm_icon_cache()
 
 
     def _init_layout(self):
@@ -116,6 +144,8 @@ class XMBMenu(XMBMenuBase):
         arrow_image = get_image("F1F1F1") or self._create_default_arrow()
         self.arrow_image = pygame.transform.smoothscale(arrow_image, (self.arrow_size, self.arrow_size))
         self.target_offset_x = -self.section * self.spacing
+        for old_font in [self.font, self.dark_menu_font, *self.text_fonts.values()]:
+            text_cache.forget_font(old_font)
         self.font = self._create_font(int(self.H * 0.025))
         self.text_fonts.update({
             'normal': pygame.font.SysFont('arial', int(self.font.get_height() * self.vertical_text_scale)),
@@ -131,6 +161,13 @@ class XMBMenu(XMBMenuBase):
                 'normal': pygame.transform.smoothscale(image, (int(image.get_width() * scale_factor), int(image.get_height() * scale_factor))),
                 'selected': pygame.transform.smoothscale(image, (int(image.get_width() * scale_factor * self.selected_icon_scale), int(image.get_height() * scale_factor * self.selected_icon_scale)))
             }
+        self.warm_icon_cache()
+
+
+    def warm_icon_cache(self):
+        """Escala por adelantado los iconos verticales a los tamaños normal y seleccionado."""
+        sizes = [int(self.icon_size_base * self.vertical_icon_scale), int(self.icon_size_base * self.vertical_icon_selected_scale)]
+        warm_scaled_images(set(self.vertical_images.values()) | {self._default_image}, sizes)
 
 
     def on_resolution_change(self, width, height):
@@ -150,7 +187,12 @@ class XMBMenu(XMBMenuBase):
     # NUEVO MÉTODO AGREGADO
     def exit_file_manager(self):
         self.showing_files = False
-        self.file_list = []
+        self.type_ahead_text = ""
+        self.dir_loader.cancel()
+        self.dir_watcher.stop()
+        self.dir_loading = False
+        self.dir_model.clear()
+        self._sync_file_list()
         self.file_index = 0
         self.current_path = None
         self.file_list_offset_x = 0
@@ -158,6 +200,151 @@ class XMBMenu(XMBMenuBase):
         self.play_option_sound()
 
 
+    def load_directory(self, path):
+        """
+        Abre path en el gestor de archivos. El listado llega por bloques desde
+        DirectoryLoader (ver poll_directory); mientras, la lista se va llenando.
+        """
+        self.current_path = path
+        self.dir_model.clear()
+        self._sync_file_list()
+        self.file_index = 0
+        self.type_ahead_text = ""
+        self.dir_loading = True
+        # Vigilar antes de listar: lo que cambie durante el listado también llega
+        self.dir_watcher.watch(path)
+        self.dir_loader.load(path)
+
+
+    def poll_directory(self):
+        """
+        Aplica los bloques de listado que hayan llegado y, con el listado ya
+        completo, los cambios que avise el DirectoryWatcher (se llama en cada update).
+        """
+        if self.dir_loading:
+            chunks, removed, done = [], [], False
+            for kind, data in self.dir_loader.poll():
+                if kind == "chunk":
+                    chunks.extend(data)
+                elif kind == "removed":
+                    removed.extend(data)
+                else:
+                    done = True
+            if chunks or removed:
+                self.update_file_list(lambda: (self.dir_model.remove_names(removed), self.dir_model.add_entries(chunks)),
+                                      keep_top=True)
+            self.dir_loading = not done
+        elif self.showing_files and self.dir_watcher.active:
+            self.apply_directory_changes(self.dir_watcher.poll())
+        if self.type_ahead_text and time.monotonic() - self.type_ahead_time > TYPE_AHEAD_TIMEOUT:
+            self.clear_type_ahead()
+
+
+    def apply_directory_changes(self, changes):
+        """
+        Aplica al modelo los cambios de fswatch sin volver a listar la carpeta.
+        La selección sigue en la misma entrada (también si se renombra) y las
+        filas renombradas conservan su posición animada.
+        """
+        if not changes:
+            return
+        if any(kind == "rescan" for kind, *_ in changes):
+            print(f"[XMBMenu] Se perdieron cambios de {self.current_path}; se vuelve a listar")
+            self.load_directory(self.current_path)
+            return
+        final = {}  # nombre -> FileEntry, o None si ya no está
+        renamed = {}
+        for kind, *data in changes:
+            if kind == "created":
+                final[data[0].name] = data[0]
+            elif kind == "deleted":
+                final[data[0]] = None
+            elif kind == "renamed":
+                old, entry = data
+                final[old] = None
+                final[entry.name] = entry
+                renamed[old] = entry.name
+        for old, new in renamed.items():
+            if old in self.last_y_positions_files:
+                self.last_y_positions_files[new] = self.last_y_positions_files.pop(old)
+        removed = [name for name, entry in final.items() if entry is None]
+        added = [entry for entry in final.values() if entry is not None]
+        self.update_file_list(lambda: (self.dir_model.remove_names(removed), self.dir_model.add_entries(added)),
+                              renamed=renamed)
+
+
+    def update_file_list(self, change, keep_top=False, renamed=None):
+        """
+        Aplica change() al modelo de la carpeta manteniendo seleccionada la misma
+        entrada. Con keep_top (listado todavía llegando) una selección en la
+        primera fila se queda arriba.
+        """
+        selected = self.file_list[self.file_index] if self.file_index < len(self.file_list) else None
+        if keep_top and self.file_index == 0:
+            selected = None
+        if renamed and selected in renamed:
+            selected = renamed[selected]
+        change()
+        self._sync_file_list()
+        index = self.dir_model.index_of(selected) if selected is not None else None
+        self.file_index = index if index is not None else min(self.file_index, max(0, len(self.file_list) - 1))
+
+
+    def _sync_file_list(self):
+        self.file_list = self.dir_model.names
+        self.file_entries = self.dir_model.by_name
+
+
+    def type_ahead(self, event):
+        """
+        Filtro tecleando en el gestor de archivos: la lista se reduce a las
+        entradas que contienen lo escrito y la selección va a la primera que
+        empieza por ello. Retroceso borra una letra; Escape o TYPE_AHEAD_TIMEOUT
+        sin teclear quitan el filtro. Devuelve True si el evento se ha usado.
+        """
+        if event.key == pygame.K_TAB:
+            mode = SORT_MODES[(SORT_MODES.index(self.dir_model.sort_mode) + 1) % len(SORT_MODES)]
+            self.update_file_list(lambda: self.dir_model.set_sort_mode(mode))
+            print(f"[XMBMenu] Orden de archivos: {mode}")
+            return True
+        if event.key == pygame.K_ESCAPE and self.type_ahead_text:
+            self.clear_type_ahead()
+            return True
+        if event.key == pygame.K_BACKSPACE and self.type_ahead_text:
+            self.set_type_ahead(self.type_ahead_text[:-1])
+            return True
+        char = event.unicode
+        if not char or not char.isprintable() or event.mod & (pygame.KMOD_CTRL | pygame.KMOD_ALT):
+            return False
+        self.set_type_ahead(self.type_ahead_text + char)
+        return True
+
+
+    def set_type_ahead(self, text):
+        """Filtra la lista con text; si nada lo contiene, se ignora la última letra."""
+        self.type_ahead_time = time.monotonic()
+        previous = self.type_ahead_text
+        selected = self.file_list[self.file_index] if self.file_index < len(self.file_list) else None
+        self.update_file_list(lambda: self.dir_model.set_filter(text))
+        if text and not self.file_list:
+            self.update_file_list(lambda: self.dir_model.set_filter(previous))
+            return
+        self.type_ahead_text = text
+        index = self.dir_model.find(text) if text else None
+        if index is None and self.dir_model.index_of(selected) is None:
+            index = 0  # La entrada seleccionada ya no está en la vista
+        if index is not None and index != self.file_index:
+            self.file_index = index
+            self.jump_offset = int(self.H * 0.065)
+            self.play_option_sound()
+
+
+    def clear_type_ahead(self):
+        """Quita el filtro conservando la entrada seleccionada."""
+        self.type_ahead_text = ""
+        self.update_file_list(lambda: self.dir_model.set_filter(""))
+
+
     def handle_event(self, event):
         if self.state == "music_player" and self.music_player:
             self.music_player.handle_event(event)
@@ -205,6 +392,9 @@ class XMBMenu(XMBMenuBase):
             if self.dark_menu_active and self.dark_menu_sound:
                 self.dark_menu_sound.play()
             return
+        # Después de los atajos globales: la búsqueda no debe tapar ninguno
+        if self.showing_files and self.type_ahead(event):
+            return
         old_section, old_subsection = self.section, self.subsection
         old_ajustes_idx = self.ajustes_pantalla_index
         old_file_index = self.file_index
@@ -239,20 +429,17 @@ class XMBMenu(XMBMenuBase):
                 self.jump_offset = int(self.H * 0.065)
             elif event.key == pygame.K_LEFT:
                 if os.path.dirname(self.current_path) != self.current_path:  # Check if not at root
-                    self.current_path = os.path.dirname(self.current_path)
-                    self.file_list = os.listdir(self.current_path) or []
-                    self.file_index = 0
+                    self.load_directory(os.path.dirname(self.current_path))
                     self.play_option_sound()
                 else:
                     self.exit_file_manager()
             elif event.key == pygame.K_RETURN and self.file_list:
                 selected = self.file_list[self.file_index]
                 path = os.path.join(self.current_path, selected)
-                if os.path.isdir(path):
-                    self.current_path = path
-                    self.file_list = os.listdir(self.current_path) or []
-                    self.file_index = 0
-                elif os.path.isfile(path) and selected.lower().endswith((".mp3", ".wav", ".aac", ".wma")):
+                entry = self.file_entries.get(selected)
+                if entry and entry.is_dir:
+                    self.load_directory(path)
+                elif entry and entry.kind == "audio":
                     try:
                         self.music_player = MusicVisualizer(self.screen, path)
                         self.state = "music_player"
@@ -307,9 +494,7 @@ class XMBMenu(XMBMenuBase):
                                                   setattr(self, 'state', "show_screen_settings"),
                                                   setattr(self, 'showing_ajustes_pantalla', False)),
             "Archivos": lambda: (setattr(self, 'showing_files', True),
-                                 setattr(self, 'current_path', os.path.join(os.getcwd(), "music") if category == "Música" else os.getcwd()),
-                                 setattr(self, 'file_list', os.listdir(self.current_path) or []),
-                                 setattr(self, 'file_index', 0))
+                                 self.load_directory(os.path.join(os.getcwd(), "music") if category == "Música" else os.getcwd()))
         }
         action = actions.get(category, actions.get(option))
         if action:
@@ -319,6 +504,7 @@ class XMBMenu(XMBMenuBase):
 
 
     def update(self, dt):
+        self.poll_directory()
         if self.state == "music_player" and self.music_player:
             self.music_player.update(dt)
             if not self.music_player.is_running():
@@ -358,50 +544,77 @@ class XMBMenu(XMBMenuBase):
         self.target_file_list_offset_x = self.submenu_indent if second_level_active and self.showing_files else 0
 
 
-    def draw_text_with_alpha_outline(self, surface, font, text_str, color, alpha, pos):
-        x, y = pos
+    def is_animating(self, epsilon=0.5):
+        """True mientras algún lerp del menú no se haya asentado o llegue un listado (lo usa FrameScheduler)."""
+        pairs = [
+            (self.offset_x, self.target_offset_x),
+            (self.offset_y, self.target_offset_y),
+            (self.file_list_offset_x, self.target_file_list_offset_x),
+            (self.icon_alpha, self.target_icon_alpha),
+        ]
+        return self.jump_offset > 0 or self.dir_loading or any(abs(a - b) > epsilon for a, b in pairs)
+
+
+    def bake_outline_text(self, font, text_str, color, alpha):
+        """Texto con su contorno de 8 copias ya compuesto, en alfa premultiplicado (1 px de margen)."""
         base_text = font.render(text_str, True, color)
         outline_surf = font.render(text_str, True, (255, 255, 255))
         outline_surf.set_alpha(int(alpha * 100 / 255))
-        for ox, oy in [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]:
-            surface.blit(outline_surf, (x + ox, y + oy))
-        surface.blit(base_text, pos)
+        sprite = pygame.Surface((base_text.get_width() + 2, base_text.get_height() + 2), pygame.SRCALPHA)
+        outline_surf = premultiplied(outline_surf)
+        for ox, oy in OUTLINE_OFFSETS:
+            sprite.blit(outline_surf, (1 + ox, 1 + oy), special_flags=pygame.BLEND_PREMULTIPLIED)
+        sprite.blit(premultiplied(base_text), (1, 1), special_flags=pygame.BLEND_PREMULTIPLIED)
+        return sprite
 
 
-    def draw_vertical_list(self, items, active_index, x_center, y_center, last_positions, alpha, icon_map=None, folder_icon=None, base_path=None):
-        drawn_rects = []
-        audio_extensions = (".mp3", ".wav", ".aac", ".wma")
-        for idx, item in enumerate(items):
+    def draw_text_with_alpha_outline(self, surface, font, text_str, color, alpha, pos):
+        alpha = quantize_blink_alpha(alpha)
+        sprite = text_cache.cached(font, ("outline", text_str, tuple(color), alpha),
+                                   lambda: self.bake_outline_text(font, text_str, color, alpha))
+        surface.blit(sprite, (pos[0] - 1, pos[1] - 1), special_flags=pygame.BLEND_PREMULTIPLIED)
+
+
+    def draw_vertical_list(self, items, active_index, x_center, y_center, last_positions, alpha, icon_map=None, folder_icon=None, entries=None):
+        # Solo se tocan las filas de la ventana visible; drawn_rects lleva None en las anteriores
+        first, last = self.visible_window(len(items), active_index, y_center)
+        drawn_rects = [None] * first
+        self._prune_positions(items, first, last, last_positions)
+        for idx in range(first, last):
+            item = items[idx]
             if self.showing_ajustes_pantalla and self.items[self.section] == "Ajustes" and item == "Ajustes de pantalla":
                 icon = self.vertical_images.get(item, None)
                 if icon:
                     is_active = idx == active_index
                     icon_scale = self.vertical_icon_selected_scale if is_active else self.vertical_icon_scale
                     icon_size = int(self.icon_size_base * icon_scale)
-                    icon_scaled = pygame.transform.smoothscale(icon, (icon_size, icon_size))
+                    icon_scaled = get_scaled_image(icon, icon_size)
                     icon_rect = icon_scaled.get_rect(midtop=(x_center, y_center + (idx - active_index) * self.line_height))
                     self.screen.blit(icon_scaled, icon_rect)
                 continue
-            relative_index = idx - active_index
-            spacing = self.line_height if relative_index == 0 else (self.line_height * 3.0 if relative_index < 0 else self.line_height)
-            target_y = y_center + (relative_index * spacing)
+            target_y = self._row_target_y(idx - active_index, y_center)
             last_positions[item] = lerp(last_positions.get(item, target_y) - self.jump_offset, target_y, 0.15)
             # Determine icon based on context
             if self.items[self.section] == "Usuarios":
                 icon = self.vertical_images.get("Usuario ya creado" if item in self.user_manager.users else "Nuevo usuario" if item == "Crear nuevo usuario" else item, None)
-            elif base_path and os.path.isfile(os.path.join(base_path, item)) and item.lower().endswith(audio_extensions):
-                icon = self.vertical_images.get("Audio", None)  # Use B544D5 for audio files
-            elif base_path and os.path.isdir(os.path.join(base_path, item)):
-                icon = folder_icon or self._default_image  # Use folder_icon or default for folders
+            elif entries is not None:
+                entry = entries.get(item)
+                kind = entry.kind if entry else None
+                if kind == "audio":
+                    icon = self.vertical_images.get("Audio", None)  # Use B544D5 for audio files
+                elif kind == "folder":
+                    icon = folder_icon or self._default_image  # Use folder_icon or default for folders
+                else:
+                    icon = None
             else:
                 icon = icon_map.get(item) if icon_map else None
             is_active = idx == active_index
             icon_scale = self.vertical_icon_selected_scale if is_active else self.vertical_icon_scale
             font = self.text_fonts['selected'] if is_active else self.text_fonts['normal']
             icon_size = int(self.icon_size_base * icon_scale)
-            text_surface = font.render(item, True, (255, 255, 255))
+            text_surface = text_cache.render(font, item, True, (255, 255, 255))
             if icon:
-                icon_scaled = pygame.transform.smoothscale(icon, (icon_size, icon_size))
+                icon_scaled = get_scaled_image(icon, icon_size)
                 icon_rect = icon_scaled.get_rect(midtop=(x_center, last_positions[item]))
                 self.screen.blit(icon_scaled, icon_rect)
                 text_rect = text_surface.get_rect(midleft=(icon_rect.right + self.text_offset, icon_rect.centery))
@@ -415,19 +628,39 @@ class XMBMenu(XMBMenuBase):
         return drawn_rects
 
 
-    def draw_submenu(self, items, active_index, selected_rect, x_center, y_center, last_positions, alpha, empty_message, offset_x, icon_map=None, folder_icon=None, base_path=None):
+    def visible_window(self, count, active_index, y_center):
+        """Rango [first, last) de filas que pueden verse (más LIST_MARGIN_ROWS a cada lado)."""
+        line_height = max(1, self.line_height)
+        above = int((y_center + self.icon_size_base) / (line_height * 3.0)) + 1 + LIST_MARGIN_ROWS
+        below = int((self.H - y_center) / line_height) + 1 + LIST_MARGIN_ROWS
+        return max(0, active_index - above), min(count, active_index + below + 1)
+
+
+    def _prune_positions(self, items, first, last, last_positions):
+        """Las filas que salen de la ventana olvidan su posición: al volver parten de su destino."""
+        if len(last_positions) <= (last - first) + 2 * LIST_MARGIN_ROWS:
+            return
+        window = set(items[first:last])
+        for item in [key for key in last_positions if key not in window]:
+            del last_positions[item]
+
+
+    def submenu_center_y(self, selected_rect, y_center):
+        return (selected_rect.centery if selected_rect else y_center) - int(self.H * 0.10)
+
+
+    def draw_submenu(self, items, active_index, selected_rect, x_center, y_center, last_positions, alpha, empty_message, offset_x, icon_map=None, folder_icon=None, entries=None):
         if not items:
-            text_surface = self.text_fonts['normal'].render(empty_message, True, (200, 200, 200))
+            text_surface = text_cache.render(self.text_fonts['normal'], empty_message, True, (200, 200, 200))
             self.screen.blit(text_surface, text_surface.get_rect(center=(self.W // 2, self.H // 2)))
             return
-        vertical_offset = -int(self.H * 0.10)
-        submenu_y = (selected_rect.centery if selected_rect else y_center) + vertical_offset
+        submenu_y = self.submenu_center_y(selected_rect, y_center)
         arrow_x = x_center + self.submenu_indent
         arrow_y = submenu_y
         arrow_rect = self.arrow_image.get_rect(center=(arrow_x, arrow_y))
         self.screen.blit(self.arrow_image, arrow_rect)
         submenu_x = arrow_x + self.arrow_size + self.submenu_offset + offset_x
-        self.draw_vertical_list(items, active_index, submenu_x, submenu_y, last_positions, alpha, icon_map, folder_icon, base_path)
+        self.draw_vertical_list(items, active_index, submenu_x, submenu_y, last_positions, alpha, icon_map, folder_icon, entries)
 
 
     def draw(self):
@@ -445,34 +678,66 @@ class XMBMenu(XMBMenuBase):
             if self.screen_settings:
                 self.screen_settings.draw(self.waves, self.W, self.H, time.time())
             else:
-                placeholder = self.font.render("Pantalla: Ajustes de salida de video", True, (255, 255, 0))
+                placeholder = text_cache.render(self.font, "Pantalla: Ajustes de salida de video", True, (255, 255, 0))
                 self.screen.blit(placeholder, (int(self.W * 0.05) - int(self.W * 0.20), int(self.H * 0.23)))
         elif self.state == "show_theme_settings":
             if self.theme_settings:
                 self.theme_settings.draw(self.W, self.H, time.time())
             else:
-                placeholder = self.font.render("Pantalla: Ajustes de tema", True, (255, 255, 0))
+                placeholder = text_cache.render(self.font, "Pantalla: Ajustes de tema", True, (255, 255, 0))
                 self.screen.blit(placeholder, (int(self.W * 0.05) - int(self.W * 0.20), int(self.H * 0.23)))
         if self.dark_menu_active and self.dark_menu_font:
             self.screen.blit(self.dark_menu_surf, (0, 0))
-            text_surf = self.dark_menu_font.render("MENU OSCURO", True, (255, 255, 255))
+            text_surf = text_cache.render(self.dark_menu_font, "MENU OSCURO", True, (255, 255, 255))
             self.screen.blit(text_surf, text_surf.get_rect(center=(self.W // 2, self.H // 2)))
 
 
-    def draw_menu(self):
-        W, H = self.W, self.H
-        start_x = (W // 2) + self.menu_offset_x
-        cat_positions = []
-        alpha = int((math.sin((time.time() - self.start_time) % self.blink_duration / self.blink_duration * 2 * math.pi - math.pi / 2) + 1) / 2 * 255)
+    def _row_target_y(self, relative_index, y_center):
+        spacing = self.line_height if relative_index == 0 else (self.line_height * 3.0 if relative_index < 0 else self.line_height)
+        return y_center + (relative_index * spacing)
 
 
-        if not self.items or self.section < 0 or self.section >= len(self.items):
-            placeholder = self.font.render("Error: Menú no inicializado", True, (255, 0, 0))
-            self.screen.blit(placeholder, (int(self.W * 0.05), int(self.H * 0.05)))
-            print(f"Error: self.items is {self.items}, self.section is {self.section}")
-            return
+    def _list_settled(self, items, active_index, y_center, last_positions, epsilon=0.5):
+        """True si ninguna fila de la lista sigue desplazándose hacia su posición."""
+        if self.jump_offset > 0:
+            return False
+        first, last = self.visible_window(len(items), active_index, y_center)
+        for idx in range(first, last):
+            item = items[idx]
+            target_y = self._row_target_y(idx - active_index, y_center)
+            if abs(last_positions.get(item, target_y) - target_y) > epsilon:
+                return False
+        return True
+
+
+    def _window_key(self, items, active_index, y_center):
+        """Clave de capa de una lista: solo depende de las filas de la ventana visible."""
+        first, last = self.visible_window(len(items), active_index, y_center)
+        return len(items), first, tuple(items[first:last])
 
 
+    def menu_blink_alpha(self):
+        phase = (time.time() - self.start_time) % self.blink_duration / self.blink_duration
+        return self.blink_ramp[int(phase * len(self.blink_ramp)) % len(self.blink_ramp)]
+
+
+    def active_submenu_kind(self):
+        """"ajustes", "files" o None según el submenú de segundo nivel abierto."""
+        active_cat = self.items[self.section]
+        submenu = self.submenus.get(active_cat, [])
+        if not submenu or self.subsection >= len(submenu):
+            return None
+        if self.showing_ajustes_pantalla and active_cat == "Ajustes" and submenu[self.subsection] == "Ajustes de pantalla":
+            return "ajustes"
+        if self.showing_files and active_cat in ["Fotos", "Música", "Videos"] and submenu[self.subsection] == "Archivos":
+            return "files"
+        return None
+
+
+    def draw_categories(self):
+        """Barra horizontal de categorías. Devuelve la x de cada icono dibujado."""
+        start_x = (self.W // 2) + self.menu_offset_x
+        cat_positions = []
         for idx, name in enumerate(self.items):
             if idx != self.section and self.icon_alpha <= 0:
                 continue
@@ -482,43 +747,124 @@ class XMBMenu(XMBMenuBase):
             self.screen.blit(img_scaled, img_rect)
             cat_positions.append(img_rect.centerx)
             if idx == self.section:
-                text_surface = self.font.render(name, True, (255, 255, 255))
+                text_surface = text_cache.render(self.font, name, True, (255, 255, 255))
                 self.screen.blit(text_surface, text_surface.get_rect(midtop=(img_rect.centerx, img_rect.bottom + int(self.H * 0.015))))
+        return cat_positions
 
 
-        if not cat_positions:
-            print(f"Error: cat_positions is empty, self.section is {self.section}")
-            placeholder = self.font.render("Error: No se encontraron categorías", True, (255, 0, 0))
-            self.screen.blit(placeholder, (int(self.W * 0.05), int(self.H * 0.05)))
-            return
-
-
-        active_cat = self.items[self.section]
-        submenu = self.submenus.get(active_cat, [])
-        self.vert_x_center = cat_positions[min(self.section, len(cat_positions) - 1)]
-        drawn_rects = self.draw_vertical_list(
+    def draw_main_list(self, alpha):
+        submenu = self.submenus.get(self.items[self.section], [])
+        return self.draw_vertical_list(
             submenu, self.subsection if self.subsection < len(submenu) else 0, self.vert_x_center, self.vert_y_center,
             self.last_y_positions, alpha, icon_map=self.vertical_images, folder_icon=self.vertical_images.get("Archivos")
         )
-        selected_rect = drawn_rects[self.subsection] if self.subsection < len(drawn_rects) else None
 
 
-        if self.showing_ajustes_pantalla and active_cat == "Ajustes" and submenu and submenu[self.subsection] == "Ajustes de pantalla":
+    def draw_active_submenu(self, selected_rect, alpha):
+        kind = self.active_submenu_kind()
+        if kind == "ajustes":
             self.draw_submenu(
                 self.ajustes_pantalla_items, self.ajustes_pantalla_index, selected_rect, self.vert_x_center, self.vert_y_center,
                 self.last_y_positions_files, alpha, "No hay ajustes disponibles", self.ajustes_list_offset_x, self.vertical_images
             )
-        elif self.showing_files and active_cat in ["Fotos", "Música", "Videos"] and submenu and submenu[self.subsection] == "Archivos":
+        elif kind == "files":
             self.draw_submenu(
                 self.file_list, self.file_index, selected_rect, self.vert_x_center, self.vert_y_center,
-                self.last_y_positions_files, alpha, "No se encontraron archivos", self.file_list_offset_x,
-                folder_icon=self.vertical_images.get("Archivos"), base_path=self.current_path
+                self.last_y_positions_files, alpha, "Cargando..." if self.dir_loading else "No se encontraron archivos", self.file_list_offset_x,
+                folder_icon=self.vertical_images.get("Archivos"), entries=self.file_entries
             )
+            if self.type_ahead_text:
+                filter_surface = text_cache.render(self.font, f"Buscar: {self.type_ahead_text}", True, (200, 200, 200))
+                self.screen.blit(filter_surface, (int(self.W * 0.03), self.H - int(self.H * 0.04)))
 
 
+    def draw_hud(self):
         user_text = f"Usuario activo: {self.active_user}"
-        user_surface = self.font.render(user_text, True, (200, 200, 200))
-        self.screen.blit(user_surface, (W - user_surface.get_width() - int(self.W * 0.03), H - int(self.H * 0.04)))
+        user_surface = text_cache.render(self.font, user_text, True, (200, 200, 200))
+        self.screen.blit(user_surface, (self.W - user_surface.get_width() - int(self.W * 0.03), self.H - int(self.H * 0.04)))
+
+
+    def draw_menu(self):
+        alpha = self.menu_blink_alpha()
+
+
+        if not self.items or self.section < 0 or self.section >= len(self.items):
+            placeholder = self.font.render("Error: Menú no inicializado", True, (255, 0, 0))
+            self.screen.blit(placeholder, (int(self.W * 0.05), int(self.H * 0.05)))
+            print(f"Error: self.items is {self.items}, self.section is {self.section}")
+            return
+
+
+        cat_positions = self.draw_categories()
+
+
+        if not cat_positions:
+            print(f"Error: cat_positions is empty, self.section is {self.section}")
+            placeholder = self.font.render("Error: No se encontraron categorías", True, (255, 0, 0))
+            self.screen.blit(placeholder, (int(self.W * 0.05), int(self.H * 0.05)))
+            return
+
+
+        self.vert_x_center = cat_positions[min(self.section, len(cat_positions) - 1)]
+        drawn_rects = self.draw_main_list(alpha)
+        selected_rect = drawn_rects[self.subsection] if self.subsection < len(drawn_rects) else None
+
+
+        self.draw_active_submenu(selected_rect, alpha)
+        self.draw_hud()
+
+
+    def can_use_layers(self):
+        """El compositor de capas solo cubre el menú principal."""
+        return self.state == "menu" and not self.show_waves_only and not self.dark_menu_active
+
+
+    def draw_on(self, surface, draw, *args):
+        screen, self.screen = self.screen, surface
+        try:
+            return draw(*args)
+        finally:
+            self.screen = screen
+
+
+    def draw_menu_layers(self, compositor):
+        """
+        draw_menu sobre capas del Compositor: cada capa se redibuja solo si
+        cambia su clave (None mientras haya filas animándose).
+        """
+        if not self.items or self.section < 0 or self.section >= len(self.items):
+            compositor.layer("categories", None, lambda surface: self.draw_on(surface, self.draw_menu))
+            return
+        alpha = self.menu_blink_alpha()  # Ya cuantizado: como mucho OUTLINE_ALPHA_LEVELS claves distintas
+
+        cat_key = (self.W, self.H, tuple(self.items), self.section, round(self.offset_x, 1), int(self.icon_alpha))
+        cat_positions = compositor.layer("categories", cat_key, lambda surface: self.draw_on(surface, self.draw_categories))
+        if not cat_positions:
+            return
+        self.vert_x_center = cat_positions[min(self.section, len(cat_positions) - 1)]
+
+        submenu = self.submenus.get(self.items[self.section], [])
+        active_index = self.subsection if self.subsection < len(submenu) else 0
+        list_key = None
+        if self._list_settled(submenu, active_index, self.vert_y_center, self.last_y_positions):
+            list_key = (self.W, self.H, self.vert_x_center, self._window_key(submenu, active_index, self.vert_y_center),
+                        active_index, alpha, self.showing_ajustes_pantalla)
+        drawn_rects = compositor.layer("list", list_key, lambda surface: self.draw_on(surface, self.draw_main_list, alpha))
+        selected_rect = drawn_rects[self.subsection] if self.subsection < len(drawn_rects) else None
+
+        kind = self.active_submenu_kind()
+        if kind:
+            if kind == "ajustes":
+                items, index, offset = self.ajustes_pantalla_items, self.ajustes_pantalla_index, self.ajustes_list_offset_x
+            else:
+                items, index, offset = self.file_list, self.file_index, self.file_list_offset_x
+            submenu_key = None
+            submenu_y = self.submenu_center_y(selected_rect, self.vert_y_center)
+            if self._list_settled(items, index, submenu_y, self.last_y_positions_files):
+                submenu_key = (kind, self.W, self.H, self.vert_x_center, self._window_key(items, index, submenu_y), index, round(offset, 1),
+                               tuple(selected_rect) if selected_rect else None, alpha, self.current_path, self.dir_loading,
+                               self.type_ahead_text)
+            compositor.layer("submenu", submenu_key, lambda surface: self.draw_on(surface, self.draw_active_submenu, selected_rect, alpha))
 
 
     def draw_clock(self):